@@ -0,0 +1,232 @@
+"""Benchmark suite for the Dot service.
+
+Generates synthetic trees of increasing size and times the tree endpoints,
+the InternalAIModel analyses (through generate_response, so large trees take
+the run_tree_work offload path), build_context_prompt and the chat endpoint
+against a stub model server. Results are written as JSON and compared with
+the regression thresholds in thresholds.json (and optionally a baseline run).
+
+    cd dot
+    python benchmarks/run_benchmarks.py --sizes 1000,10000,100000 --output benchmarks/results/latest.json
+"""
+import argparse
+import asyncio
+import json
+import os
+import platform
+import statistics
+import sys
+import time
+from datetime import datetime
+
+BENCHMARK_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.dirname(BENCHMARK_DIR))
+sys.path.insert(0, BENCHMARK_DIR)
+
+from stub_model_server import start_stub_server  # noqa: E402
+from tree_generator import generate_tree  # noqa: E402
+
+# Analysis benchmark -> a chat message that _route_message sends to that analysis
+ANALYSES = {
+    "_analyze_product_tree": "Analyze the product tree",
+    "_suggest_improvements": "Suggest improvements to the product tree",
+    "_analyze_status": "What is the status of the product tree?",
+    "_analyze_goals": "How are our goals doing?",
+    "_analyze_jobs": "Review the jobs",
+    "_analyze_work_items": "Summarise the work items",
+    "_analyze_priorities": "Which priority needs attention?",
+    "_analyze_teams": "How is each team loaded?"
+}
+
+DEFAULT_THRESHOLDS = os.path.join(BENCHMARK_DIR, "thresholds.json")
+
+
+def summarise(name, nodes, timings):
+    timings_ms = [timing * 1000 for timing in timings]
+    return {
+        "benchmark": name,
+        "nodes": nodes,
+        "runs": len(timings_ms),
+        "min_ms": round(min(timings_ms), 3),
+        "median_ms": round(statistics.median(timings_ms), 3),
+        "mean_ms": round(statistics.mean(timings_ms), 3),
+        "max_ms": round(max(timings_ms), 3)
+    }
+
+
+async def time_async(func, runs, warmup, setup=None):
+    """Time func; setup, if given, runs untimed before every call"""
+    timings = []
+    for run in range(warmup + runs):
+        if setup:
+            await setup()
+        start = time.perf_counter()
+        await func()
+        if run >= warmup:
+            timings.append(time.perf_counter() - start)
+    return timings
+
+
+def time_sync(func, runs, warmup):
+    for _ in range(warmup):
+        func()
+    timings = []
+    for _ in range(runs):
+        start = time.perf_counter()
+        func()
+        timings.append(time.perf_counter() - start)
+    return timings
+
+
+async def run_size(main, client, nodes, args):
+    """Run every benchmark against one generated tree"""
+    tree = generate_tree(nodes=nodes, depth=args.depth, fanout=args.fanout, skew=args.skew, seed=args.seed)
+    tree_body = json.dumps(tree).encode()
+    context = {"productTree": tree}
+    chat_body = json.dumps({"message": "Please analyze the product tree", "context": context}).encode()
+    headers = {"Content-Type": "application/json"}
+    results = []
+
+    async def post_import():
+        response = await client.post("/product-tree/import", content=tree_body, headers=headers)
+        response.raise_for_status()
+
+    async def get(path):
+        response = await client.get(path)
+        response.raise_for_status()
+
+    async def new_version():
+        # A one-node batch commits a new version, so the next read regenerates its documents
+        operation = {"op": "update", "node_id": tree["nodes"][0]["id"], "updates": {"summary": time.time()}}
+        response = await client.post("/product-tree/batch", json={"operations": [operation]})
+        response.raise_for_status()
+
+    async def post_chat():
+        response = await client.post("/ai/chat", content=chat_body, headers=headers)
+        response.raise_for_status()
+
+    results.append(summarise("import", nodes, await time_async(post_import, args.runs, args.warmup)))
+    for name, path in (("debug", "/product-tree/debug"), ("xml", "/product-tree/xml")):
+        timings = await time_async(lambda: get(path), args.runs, args.warmup, setup=new_version)
+        results.append(summarise(name, nodes, timings))
+        timings = await time_async(lambda: get(path), args.runs, args.warmup)
+        results.append(summarise(f"{name}_cached", nodes, timings))
+
+    for analysis, message in ANALYSES.items():
+        timings = await time_async(lambda: main.ai_model.generate_response(message, context), args.runs, args.warmup)
+        results.append(summarise(f"analysis{analysis}", nodes, timings))
+
+    timings = time_sync(lambda: main.build_context_prompt("Please analyze the product tree", context), args.runs, args.warmup)
+    results.append(summarise("build_context_prompt", nodes, timings))
+    results.append(summarise("chat", nodes, await time_async(post_chat, args.runs, args.warmup)))
+
+    return results
+
+
+def check_regressions(results, thresholds, baseline, tolerance):
+    """Return a description of every result that exceeds its threshold or the baseline"""
+    failures = []
+    baseline_medians = {
+        (entry["benchmark"], entry["nodes"]): entry["median_ms"]
+        for entry in (baseline or {}).get("results", [])
+    }
+
+    for result in results:
+        key = (result["benchmark"], result["nodes"])
+        limit = thresholds.get(result["benchmark"], {}).get(str(result["nodes"]))
+        if limit is not None and result["median_ms"] > limit:
+            failures.append(f"{key[0]} @ {key[1]} nodes: median {result['median_ms']}ms exceeds threshold {limit}ms")
+
+        previous = baseline_medians.get(key)
+        if previous is not None and result["median_ms"] > previous * (1 + tolerance):
+            failures.append(
+                f"{key[0]} @ {key[1]} nodes: median {result['median_ms']}ms is more than "
+                f"{tolerance:.0%} slower than baseline {previous}ms"
+            )
+
+    return failures
+
+
+async def run_benchmarks(args):
+    os.environ["AI_INTEGRATION_ENABLED"] = "true"
+    os.environ["LOCAL_MODEL_ENDPOINT"] = f"http://127.0.0.1:{args.model_port}"
+    os.environ.pop("TREE_STORE_PATH", None)
+
+    import httpx
+    import main
+
+    server = start_stub_server(args.model_port, args.model_latency_ms)
+    results = []
+    try:
+        transport = httpx.ASGITransport(app=main.app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://dot", timeout=None) as client:
+            for nodes in args.sizes:
+                print(f"Benchmarking {nodes} nodes...", file=sys.stderr)
+                results.extend(await run_size(main, client, nodes, args))
+    finally:
+        server.should_exit = True
+
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the Dot service on synthetic trees")
+    parser.add_argument("--sizes", default="1000,10000,100000", help="Comma-separated node counts, up to 1000000")
+    parser.add_argument("--depth", type=int, default=4)
+    parser.add_argument("--fanout", type=float, default=8)
+    parser.add_argument("--skew", type=float, default=0.5)
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--warmup", type=int, default=1)
+    parser.add_argument("--model-port", type=int, default=11434, help="Port for the stub model server")
+    parser.add_argument("--model-latency-ms", type=float, default=50)
+    parser.add_argument("--output", help="Write results JSON to this file instead of stdout")
+    parser.add_argument("--thresholds", default=DEFAULT_THRESHOLDS, help="Median-latency thresholds JSON")
+    parser.add_argument("--baseline", help="Previous results JSON to compare against")
+    parser.add_argument("--tolerance", type=float, default=0.25, help="Allowed slowdown relative to the baseline")
+    args = parser.parse_args()
+    args.sizes = [int(size) for size in args.sizes.split(",")]
+
+    results = asyncio.run(run_benchmarks(args))
+
+    report = {
+        "generated_at": datetime.now().isoformat(),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "config": {
+            "sizes": args.sizes,
+            "depth": args.depth,
+            "fanout": args.fanout,
+            "skew": args.skew,
+            "seed": args.seed,
+            "runs": args.runs,
+            "model_latency_ms": args.model_latency_ms
+        },
+        "results": results
+    }
+
+    if args.output:
+        os.makedirs(os.path.dirname(os.path.abspath(args.output)), exist_ok=True)
+        with open(args.output, "w") as output:
+            json.dump(report, output, indent=2)
+    else:
+        print(json.dumps(report, indent=2))
+
+    thresholds = {}
+    if args.thresholds and os.path.exists(args.thresholds):
+        with open(args.thresholds) as thresholds_file:
+            thresholds = json.load(thresholds_file)
+
+    baseline = None
+    if args.baseline:
+        with open(args.baseline) as baseline_file:
+            baseline = json.load(baseline_file)
+
+    failures = check_regressions(results, thresholds, baseline, args.tolerance)
+    for failure in failures:
+        print(f"REGRESSION: {failure}", file=sys.stderr)
+    sys.exit(1 if failures else 0)
+
+
+if __name__ == "__main__":
+    main()
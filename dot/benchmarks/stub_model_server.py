@@ -0,0 +1,68 @@
+"""Stub local model server that stands in for Ollama during benchmarks.
+
+Answers both the Ollama /api/generate and the OpenAI-compatible
+/v1/chat/completions routes after a fixed delay, so chat benchmarks measure
+the Dot service rather than model inference.
+
+    python benchmarks/stub_model_server.py --port 11434 --latency-ms 50
+"""
+import argparse
+import asyncio
+import threading
+import time
+
+import uvicorn
+from fastapi import FastAPI, Request
+
+STUB_RESPONSE = "Stub model response for benchmarking."
+
+
+def create_stub_app(latency_ms: float = 50) -> FastAPI:
+    stub_app = FastAPI(title="Stub Model Server")
+    stub_app.state.requests = 0
+
+    @stub_app.post("/api/generate")
+    async def generate(request: Request):
+        body = await request.json()
+        stub_app.state.requests += 1
+        await asyncio.sleep(latency_ms / 1000)
+        return {"model": body.get("model"), "response": STUB_RESPONSE, "done": True}
+
+    @stub_app.post("/v1/chat/completions")
+    async def chat_completions(request: Request):
+        body = await request.json()
+        stub_app.state.requests += 1
+        await asyncio.sleep(latency_ms / 1000)
+        return {
+            "model": body.get("model"),
+            "choices": [{"index": 0, "message": {"role": "assistant", "content": STUB_RESPONSE}}]
+        }
+
+    return stub_app
+
+
+def start_stub_server(port: int = 11434, latency_ms: float = 50) -> uvicorn.Server:
+    """Run the stub server in a background thread and wait until it accepts requests"""
+    config = uvicorn.Config(create_stub_app(latency_ms), host="127.0.0.1", port=port, log_level="warning")
+    server = uvicorn.Server(config)
+    thread = threading.Thread(target=server.run, daemon=True)
+    thread.start()
+
+    deadline = time.time() + 10
+    while not server.started:
+        if not thread.is_alive() or time.time() > deadline:
+            raise RuntimeError(f"Stub model server failed to start on port {port}")
+        time.sleep(0.05)
+    return server
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Run a stub local model server")
+    parser.add_argument("--port", type=int, default=11434)
+    parser.add_argument("--latency-ms", type=float, default=50)
+    args = parser.parse_args()
+    uvicorn.run(create_stub_app(args.latency_ms), host="127.0.0.1", port=args.port)
+
+
+if __name__ == "__main__":
+    main()
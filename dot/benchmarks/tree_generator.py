@@ -0,0 +1,190 @@
+"""Synthetic product tree generator for benchmarking the Dot service.
+
+Produces trees in the same {nodes, edges} shape the UI sends to
+/product-tree/import. Output is fully determined by the seed.
+
+    python benchmarks/tree_generator.py --nodes 100000 --depth 4 --fanout 8 --skew 0.6 -o tree.json
+    python benchmarks/tree_generator.py --nodes 10000 --status-weights blocked=0.5,completed=0.5 --missing-team-rate 0.6
+"""
+import argparse
+import json
+import math
+import random
+from typing import Any, Dict, List, Optional
+
+NODE_TYPES = ["product", "goal", "job", "work_item"]
+
+DEFAULT_STATUS_WEIGHTS = {"not_started": 0.35, "in_progress": 0.3, "completed": 0.25, "blocked": 0.1}
+DEFAULT_PRIORITY_WEIGHTS = {"P0": 0.05, "P1": 0.2, "P2": 0.5, "P3": 0.25}
+
+TITLE_VERBS = ["Build", "Revamp", "Migrate", "Improve", "Add", "Fix", "Design", "Launch", "Refactor", "Automate"]
+TITLE_OBJECTS = [
+    "login page", "checkout flow", "search index", "billing service", "onboarding emails",
+    "admin dashboard", "mobile app", "audit log", "notification center", "export to CSV",
+    "user profile", "payment retries", "reporting API", "team permissions", "data pipeline"
+]
+TITLE_QUALIFIERS = ["", "", "", "for enterprise", "v2", "for mobile", "phase 2", "in EU region"]
+
+
+def weighted_choice(rng: random.Random, weights: Dict[str, float]) -> str:
+    return rng.choices(list(weights.keys()), weights=list(weights.values()))[0]
+
+
+def sample_fanout(rng: random.Random, fanout: float, skew: float) -> int:
+    """Children per parent, log-normally spread around the mean fan-out"""
+    if skew <= 0:
+        return max(1, int(round(fanout)))
+    mu = math.log(fanout) - (skew ** 2) / 2
+    return max(1, int(round(rng.lognormvariate(mu, skew))))
+
+
+def make_title(rng: random.Random) -> str:
+    title = f"{rng.choice(TITLE_VERBS)} {rng.choice(TITLE_OBJECTS)}"
+    qualifier = rng.choice(TITLE_QUALIFIERS)
+    return f"{title} {qualifier}" if qualifier else title
+
+
+def generate_tree(
+    nodes: int = 1000,
+    depth: int = 4,
+    fanout: float = 8,
+    skew: float = 0.5,
+    roots: int = 1,
+    teams: int = 12,
+    status_weights: Optional[Dict[str, float]] = None,
+    priority_weights: Optional[Dict[str, float]] = None,
+    missing_description_rate: float = 0.3,
+    missing_team_rate: float = 0.15,
+    seed: int = 42
+) -> Dict[str, Any]:
+    """Generate a product tree with exactly `nodes` nodes and at most `depth` levels"""
+    rng = random.Random(seed)
+    status_weights = status_weights or DEFAULT_STATUS_WEIGHTS
+    priority_weights = priority_weights or DEFAULT_PRIORITY_WEIGHTS
+
+    # Zipf-like team sizes so a few teams own most of the work
+    team_weights = {f"Team {index + 1}": 1 / (index + 1) for index in range(teams)}
+    timestamp = "2025-01-01T00:00:00"
+
+    tree_nodes: List[Dict[str, Any]] = []
+    tree_edges: List[Dict[str, Any]] = []
+    depth_of: Dict[str, int] = {}
+
+    def add_node(level: int, parent_id: Optional[str]) -> str:
+        node_id = f"node_{len(tree_nodes) + 1}"
+        node_type = NODE_TYPES[min(level, len(NODE_TYPES) - 1)]
+        node = {
+            "id": node_id,
+            "title": make_title(rng),
+            "type": node_type,
+            "description": "" if rng.random() < missing_description_rate else f"Details for {node_id}",
+            "summary": "",
+            "status": weighted_choice(rng, status_weights),
+            "priority": weighted_choice(rng, priority_weights),
+            "team": "" if rng.random() < missing_team_rate else weighted_choice(rng, team_weights),
+            "owner_email": "",
+            "created_at": timestamp,
+            "updated_at": timestamp,
+            "tags": [],
+            "job_data": None
+        }
+        if node_type == "job":
+            node["job_data"] = {
+                "job_content": "As a user I want this" if rng.random() < 0.6 else "",
+                "effort_estimate": str(rng.choice([1, 2, 3, 5, 8, 13])) if rng.random() < 0.7 else "",
+                "start_date": "",
+                "end_date": ""
+            }
+
+        tree_nodes.append(node)
+        depth_of[node_id] = level
+        if parent_id:
+            tree_edges.append({
+                "id": f"edge_{len(tree_edges) + 1}",
+                "from": parent_id,
+                "to": node_id,
+                "type": "contains"
+            })
+        return node_id
+
+    level_nodes = [add_node(0, None) for _ in range(min(roots, nodes))]
+    while len(tree_nodes) < nodes:
+        parents = [node_id for node_id in level_nodes if depth_of[node_id] < depth - 1]
+        if not parents:
+            # Depth limit reached: keep widening the deepest level that may have children
+            parent_depth = max(0, depth - 2)
+            parents = [node_id for node_id, level in depth_of.items() if level == parent_depth]
+
+        next_level = []
+        for parent_id in parents:
+            for _ in range(sample_fanout(rng, fanout, skew)):
+                if len(tree_nodes) >= nodes:
+                    break
+                next_level.append(add_node(depth_of[parent_id] + 1, parent_id))
+            if len(tree_nodes) >= nodes:
+                break
+        level_nodes = next_level
+
+    return {"nodes": tree_nodes, "edges": tree_edges}
+
+
+def parse_weights(value: str) -> Dict[str, float]:
+    """Parse "key=weight,key=weight" into a weights dict"""
+    weights = {}
+    for entry in value.split(","):
+        key, separator, weight = entry.partition("=")
+        if not separator or not key.strip():
+            raise argparse.ArgumentTypeError(f"Expected key=weight, got {entry!r}")
+        try:
+            weights[key.strip()] = float(weight)
+        except ValueError:
+            raise argparse.ArgumentTypeError(f"Weight for {key.strip()!r} must be a number, got {weight!r}")
+    return weights
+
+
+def rate(value: str) -> float:
+    fraction = float(value)
+    if not 0 <= fraction <= 1:
+        raise argparse.ArgumentTypeError(f"Rate must be between 0 and 1, got {value}")
+    return fraction
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Generate a synthetic product tree")
+    parser.add_argument("--nodes", type=int, default=1000)
+    parser.add_argument("--depth", type=int, default=4)
+    parser.add_argument("--fanout", type=float, default=8)
+    parser.add_argument("--skew", type=float, default=0.5, help="Log-normal sigma for fan-out; 0 gives uniform fan-out")
+    parser.add_argument("--roots", type=int, default=1)
+    parser.add_argument("--teams", type=int, default=12)
+    parser.add_argument("--status-weights", type=parse_weights, help="e.g. not_started=0.35,in_progress=0.3,completed=0.25,blocked=0.1")
+    parser.add_argument("--priority-weights", type=parse_weights, help="e.g. P0=0.05,P1=0.2,P2=0.5,P3=0.25")
+    parser.add_argument("--missing-description-rate", type=rate, default=0.3, help="Fraction of nodes with an empty description")
+    parser.add_argument("--missing-team-rate", type=rate, default=0.15, help="Fraction of nodes with no team")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("-o", "--output", default="-", help="Output file, or - for stdout")
+    args = parser.parse_args()
+
+    tree = generate_tree(
+        nodes=args.nodes,
+        depth=args.depth,
+        fanout=args.fanout,
+        skew=args.skew,
+        roots=args.roots,
+        teams=args.teams,
+        status_weights=args.status_weights,
+        priority_weights=args.priority_weights,
+        missing_description_rate=args.missing_description_rate,
+        missing_team_rate=args.missing_team_rate,
+        seed=args.seed
+    )
+
+    if args.output == "-":
+        print(json.dumps(tree))
+    else:
+        with open(args.output, "w") as output:
+            json.dump(tree, output)
+
+
+if __name__ == "__main__":
+    main()
@@ -1,15 +1,51 @@
 from fastapi import FastAPI, Request, HTTPException
-from fastapi.responses import JSONResponse, PlainTextResponse
+from fastapi.responses import JSONResponse, PlainTextResponse, Response, StreamingResponse
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.middleware.gzip import GZipMiddleware
+from starlette.datastructures import Headers
 import json
+import orjson
+import zlib
 import os
 import httpx
 import asyncio
-from typing import Dict, List, Any, Optional
+import contextlib
+import contextvars
+import functools
+import gc
+import gzip
+import heapq
+import hmac
+import itertools
+import operator
+import random
+import re
+import sqlite3
+import sys
+import threading
+import time
+import uuid
+from array import array
+from collections import OrderedDict, deque
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from typing import Dict, List, Any, Literal, Optional
+from prometheus_client import CONTENT_TYPE_LATEST, REGISTRY, CollectorRegistry, Counter, Gauge, Histogram, generate_latest, multiprocess
 from pydantic import BaseModel
+from pyrsistent import pmap
 from datetime import datetime
 import logging
 
+# Optional transport codecs
+try:
+    import msgpack
+except ImportError:
+    msgpack = None
+
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
 # Configure logging
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
@@ -19,8 +55,207 @@ LOCAL_MODEL_ENDPOINT = os.getenv("LOCAL_MODEL_ENDPOINT", "http://localhost:11434
 LOCAL_MODEL_NAME = os.getenv("LOCAL_MODEL_NAME", "llama3.2:3b")  # Lightweight local model
 LOCAL_MODEL_TIMEOUT = int(os.getenv("LOCAL_MODEL_TIMEOUT", "30"))  # Seconds
 AI_INTEGRATION_ENABLED = os.getenv("AI_INTEGRATION_ENABLED", "true").lower() == "true"
+LOCAL_MODEL_KEEP_ALIVE = os.getenv("LOCAL_MODEL_KEEP_ALIVE", "30m")  # Ollama keep_alive: duration, seconds, or -1 for forever
+MODEL_WARMUP_ENABLED = os.getenv("MODEL_WARMUP_ENABLED", "true").lower() == "true"  # Preload the model at startup
+MODEL_WARMUP_TIMEOUT = float(os.getenv("MODEL_WARMUP_TIMEOUT", "300"))  # Seconds; a cold model load can be slow
+MODEL_KEEP_WARM_INTERVAL = float(os.getenv("MODEL_KEEP_WARM_INTERVAL", "240"))  # Seconds between idle pings; 0 disables
+MODEL_WARMUP_RETRY_INTERVAL = float(os.getenv("MODEL_WARMUP_RETRY_INTERVAL", "10"))  # Seconds between failed warm-ups
+
+# Change feed configuration
+CHANGE_FEED_BUFFER_SIZE = int(os.getenv("CHANGE_FEED_BUFFER_SIZE", "1000"))  # Events kept for resuming clients
+CHANGE_FEED_KEEPALIVE = int(os.getenv("CHANGE_FEED_KEEPALIVE", "15"))  # Seconds between keep-alive comments
+
+# Tree history configuration
+TREE_HISTORY_SIZE = int(os.getenv("TREE_HISTORY_SIZE", "50"))  # Versions kept for pinned reads and reverts
+TREE_CACHE_SIZE = int(os.getenv("TREE_CACHE_SIZE", "8"))  # Materialised trees and documents kept across versions
+
+# Shared tree store, opt-in and required when running uvicorn with several workers
+TREE_STORE_PATH = os.getenv("TREE_STORE_PATH")  # SQLite file; unset keeps the tree in process memory
+TREE_STORE_POLL_INTERVAL = float(os.getenv("TREE_STORE_POLL_INTERVAL", "1"))  # Seconds between checks for new versions
+TREE_STORE_LOCK_TIMEOUT = float(os.getenv("TREE_STORE_LOCK_TIMEOUT", "30"))  # Seconds to wait for the write lock
+TREE_STORE_CHECKPOINT_INTERVAL = int(os.getenv("TREE_STORE_CHECKPOINT_INTERVAL", "25"))  # Versions between full copies
+
+# Metrics configuration
+EVENT_LOOP_LAG_INTERVAL = float(os.getenv("EVENT_LOOP_LAG_INTERVAL", "0.5"))  # Seconds between event loop lag probes
+
+# Request profiling configuration
+PROFILE_HEADER = "X-Dot-Profile"  # Send "1" with X-Admin-Token to profile a single request
+PROFILE_SAMPLE_RATE = float(os.getenv("PROFILE_SAMPLE_RATE", "0"))  # Fraction of requests profiled automatically
+PROFILE_SAMPLE_INTERVAL_MS = float(os.getenv("PROFILE_SAMPLE_INTERVAL_MS", "5"))  # Stack sampling interval
+PROFILE_SLOWEST_COUNT = max(0, int(os.getenv("PROFILE_SLOWEST_COUNT", "20")))  # Slowest and recent profiles kept
+PROFILE_ADMIN_TOKEN = os.getenv("PROFILE_ADMIN_TOKEN")  # Required in X-Admin-Token; /admin/profiles is disabled when unset
+
+# Transport configuration
+MAX_REQUEST_BODY_MB = int(os.getenv("MAX_REQUEST_BODY_MB", "256"))  # Limit on decompressed request bodies
+RESPONSE_COMPRESSION_MIN_BYTES = int(os.getenv("RESPONSE_COMPRESSION_MIN_BYTES", "4096"))  # Smaller responses stay uncompressed
+RESPONSE_COMPRESSION_LEVEL = int(os.getenv("RESPONSE_COMPRESSION_LEVEL", "5"))  # gzip level; 9 costs ~5x more CPU for ~10% less
+
+# Near-duplicate detection configuration
+DUPLICATE_MINHASH_PERMUTATIONS = max(1, int(os.getenv("DUPLICATE_MINHASH_PERMUTATIONS", "64")))
+DUPLICATE_LSH_BANDS = int(os.getenv("DUPLICATE_LSH_BANDS", "16"))  # More bands find less similar pairs
+if not 1 <= DUPLICATE_LSH_BANDS <= DUPLICATE_MINHASH_PERMUTATIONS or DUPLICATE_MINHASH_PERMUTATIONS % DUPLICATE_LSH_BANDS:
+    # Empty bands put every node in one bucket, and uneven bands ignore part of the signature
+    requested_bands = DUPLICATE_LSH_BANDS
+    DUPLICATE_LSH_BANDS = min(max(DUPLICATE_LSH_BANDS, 1), DUPLICATE_MINHASH_PERMUTATIONS)
+    while DUPLICATE_MINHASH_PERMUTATIONS % DUPLICATE_LSH_BANDS:
+        DUPLICATE_LSH_BANDS -= 1
+    logger.warning(
+        f"DUPLICATE_LSH_BANDS={requested_bands} must evenly divide DUPLICATE_MINHASH_PERMUTATIONS="
+        f"{DUPLICATE_MINHASH_PERMUTATIONS}; using {DUPLICATE_LSH_BANDS} bands"
+    )
+DUPLICATE_SIMILARITY_THRESHOLD = float(os.getenv("DUPLICATE_SIMILARITY_THRESHOLD", "0.6"))
+DUPLICATE_TOKEN_CACHE_SIZE = int(os.getenv("DUPLICATE_TOKEN_CACHE_SIZE", "4096"))  # Per-token MinHash values kept per index
+
+# Worker pool configuration for CPU-heavy tree work
+TREE_WORKER_MODE = os.getenv("TREE_WORKER_MODE", "thread").lower()  # "thread" or "process"
+TREE_WORKER_COUNT = int(os.getenv("TREE_WORKER_COUNT", "4"))
+TREE_OFFLOAD_THRESHOLD = int(os.getenv("TREE_OFFLOAD_THRESHOLD", "2000"))  # Trees with fewer nodes run inline
+
+class FastJSONResponse(JSONResponse):
+    """JSON response rendered with orjson
+
+    FastAPI's own FastJSONResponse is deprecated and warns on every response in
+    recent releases, so the service renders with orjson directly.
+    """
+
+    def render(self, content: Any) -> bytes:
+        return orjson.dumps(content, option=orjson.OPT_NON_STR_KEYS)
+
+# Long-running startup tasks, referenced here so they aren't garbage collected mid-run
+background_tasks = set()
+
+def start_background_task(coro):
+    """Run a coroutine for the life of the service; it is cancelled at shutdown"""
+    task = asyncio.create_task(coro)
+    background_tasks.add(task)
+    task.add_done_callback(background_tasks.discard)
+    return task
+
+@contextlib.asynccontextmanager
+async def lifespan(app: FastAPI):
+    """Start the background work on startup, and stop it and the worker pool on shutdown"""
+    # Warm the local model in the background so startup is not blocked on a model load
+    if AI_INTEGRATION_ENABLED and MODEL_WARMUP_ENABLED:
+        start_background_task(keep_local_model_warm())
+    start_background_task(monitor_event_loop_lag())
+    if TREE_STORE_PATH:
+        start_background_task(poll_tree_store())
+        logger.info(f"Sharing product tree state through {TREE_STORE_PATH}")
+
+    yield
+
+    tasks = list(background_tasks)
+    for task in tasks:
+        task.cancel()
+    await asyncio.gather(*tasks, return_exceptions=True)
+    if tree_executor is not None:
+        tree_executor.shutdown(wait=False, cancel_futures=True)
+
+app = FastAPI(title="Standalone Dot Service", version="1.0.0", default_response_class=FastJSONResponse, lifespan=lifespan)
+
+def decompress_body(body: bytes, encoding: str) -> bytes:
+    """Decompress a gzip or zstd request body, refusing anything over the size limit"""
+    limit = MAX_REQUEST_BODY_MB * 1024 * 1024
+
+    if encoding == "gzip":
+        decompressor = zlib.decompressobj(16 + zlib.MAX_WBITS)
+        try:
+            data = decompressor.decompress(body, limit + 1)
+        except zlib.error as e:
+            raise ValueError(f"Invalid gzip body: {e}")
+    else:
+        chunks = []
+        size = 0
+        try:
+            with zstandard.ZstdDecompressor().stream_reader(body) as reader:
+                while size <= limit:
+                    chunk = reader.read(1024 * 1024)
+                    if not chunk:
+                        break
+                    chunks.append(chunk)
+                    size += len(chunk)
+        except zstandard.ZstdError as e:
+            raise ValueError(f"Invalid zstd body: {e}")
+        data = b"".join(chunks)
+
+    if len(data) > limit:
+        raise OverflowError(f"Decompressed body exceeds {MAX_REQUEST_BODY_MB} MB")
+    return data
+
+class DecompressRequestMiddleware:
+    """Transparently decompress request bodies sent with Content-Encoding gzip or zstd"""
+
+    def __init__(self, app):
+        self.app = app
 
-app = FastAPI(title="Standalone Dot Service", version="1.0.0")
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        encoding = Headers(scope=scope).get("content-encoding", "").strip().lower()
+        if encoding in ("", "identity"):
+            await self.app(scope, receive, send)
+            return
+
+        if encoding not in ("gzip", "zstd") or (encoding == "zstd" and zstandard is None):
+            response = JSONResponse(status_code=415, content={"detail": f"Unsupported Content-Encoding: {encoding}"})
+            await response(scope, receive, send)
+            return
+
+        chunks = []
+        more_body = True
+        while more_body:
+            message = await receive()
+            chunks.append(message.get("body", b""))
+            more_body = message.get("more_body", False)
+
+        try:
+            body = await asyncio.to_thread(decompress_body, b"".join(chunks), encoding)
+        except (ValueError, OverflowError) as e:
+            status_code = 413 if isinstance(e, OverflowError) else 400
+            response = JSONResponse(status_code=status_code, content={"detail": str(e)})
+            await response(scope, receive, send)
+            return
+
+        # Replace the headers in place: outer middleware reads the route the router stores on this scope
+        scope["headers"] = [
+            (name, value) for name, value in scope["headers"]
+            if name not in (b"content-encoding", b"content-length")
+        ]
+        scope["headers"].append((b"content-length", str(len(body)).encode()))
+        body_sent = False
+
+        async def receive_decompressed():
+            nonlocal body_sent
+            if not body_sent:
+                body_sent = True
+                return {"type": "http.request", "body": body, "more_body": False}
+            return await receive()
+
+        await self.app(scope, receive_decompressed, send)
+
+async def read_json_body(request: Request) -> Any:
+    """Decode a JSON or MessagePack request body with the fast decoders"""
+    body = await request.body()
+    content_type = request.headers.get("content-type", "").split(";")[0].strip().lower()
+
+    if content_type in ("application/msgpack", "application/x-msgpack"):
+        if msgpack is None:
+            raise HTTPException(status_code=415, detail="MessagePack support is not installed")
+        decode = functools.partial(msgpack.unpackb, raw=False)
+        decode_error = ValueError
+    else:
+        decode = orjson.loads
+        decode_error = orjson.JSONDecodeError
+
+    # The decoders hold the GIL, so a thread would not free the event loop; skipping
+    # GC passes over the new objects is what makes large bodies cheaper to decode
+    try:
+        with gc_paused():
+            return decode(body)
+    except (decode_error, ValueError) as e:
+        raise HTTPException(status_code=400, detail=f"Invalid request body: {e}")
 
 # Add CORS middleware
 app.add_middleware(
@@ -31,6 +266,220 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+# Compress large responses for clients that accept gzip, and accept compressed uploads
+app.add_middleware(GZipMiddleware, minimum_size=RESPONSE_COMPRESSION_MIN_BYTES, compresslevel=RESPONSE_COMPRESSION_LEVEL)
+app.add_middleware(DecompressRequestMiddleware)
+
+# Prometheus metrics. With several workers, set PROMETHEUS_MULTIPROC_DIR so
+# /metrics aggregates across processes.
+REQUEST_LATENCY = Histogram(
+    "dot_http_request_duration_seconds", "HTTP request latency by route",
+    ["method", "route", "status"]
+)
+MODEL_REQUEST_LATENCY = Histogram(
+    "dot_model_request_duration_seconds", "Local model call latency",
+    ["model", "api"], buckets=(0.1, 0.25, 0.5, 1, 2.5, 5, 10, 20, 30, 60, 120)
+)
+MODEL_ERRORS = Counter("dot_model_errors_total", "Failed local model calls", ["model", "api", "reason"])
+CHAT_RESPONSES = Counter("dot_chat_responses_total", "Chat responses by the engine that produced them", ["engine"])
+# Every worker converges on the same tree, so report the most recently set value from a live worker
+TREE_NODES = Gauge("dot_tree_nodes", "Nodes in the current product tree", multiprocess_mode="livemostrecent")
+TREE_VERSION = Gauge("dot_tree_version", "Current product tree version", multiprocess_mode="livemostrecent")
+TREE_REBUILD_LATENCY = Histogram(
+    "dot_tree_rebuild_duration_seconds", "Time spent building tree snapshots and their lookup maps",
+    ["operation"]
+)
+MODEL_READY = Gauge("dot_model_ready", "Whether the local model is loaded and answering", multiprocess_mode="livemin")
+EVENT_LOOP_LAG = Histogram(
+    "dot_event_loop_lag_seconds", "Delay between a scheduled wake-up and the event loop running it",
+    buckets=(0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5)
+)
+
+@app.middleware("http")
+async def record_request_metrics(request: Request, call_next):
+    """Record latency per route template, so path parameters don't explode the label set"""
+    started = time.perf_counter()
+    status = 500
+    try:
+        response = await call_next(request)
+        status = response.status_code
+        return response
+    finally:
+        route = request.scope.get("route")
+        REQUEST_LATENCY.labels(
+            method=request.method,
+            route=route.path if route else "unmatched",
+            status=str(status)
+        ).observe(time.perf_counter() - started)
+
+# Request profiling: every request records phase timings, and requests that opt in
+# (header or sampling) also collect stack samples of the event loop and tree worker threads
+class RequestProfile:
+    def __init__(self, method: str, path: str, sampled: bool):
+        self.id = uuid.uuid4().hex[:12]
+        self.method = method
+        self.path = path
+        self.sampled = sampled
+        self.started_at = datetime.now().isoformat()
+        self.duration = 0.0
+        self.status = None
+        self.phases = {}
+        self.stacks = {}  # folded stack -> sample count
+        self.sample_count = 0
+
+    def add_phase(self, name: str, seconds: float):
+        self.phases[name] = self.phases.get(name, 0.0) + seconds
+
+    def summary(self) -> Dict[str, Any]:
+        return {
+            "id": self.id,
+            "method": self.method,
+            "path": self.path,
+            "status": self.status,
+            "started_at": self.started_at,
+            "duration_ms": round(self.duration * 1000, 3),
+            "sampled": self.sampled,
+            "phases_ms": {name: round(seconds * 1000, 3) for name, seconds in self.phases.items()}
+        }
+
+    def details(self) -> Dict[str, Any]:
+        stacks = sorted(self.stacks.items(), key=lambda item: item[1], reverse=True)
+        return {
+            **self.summary(),
+            "sample_interval_ms": PROFILE_SAMPLE_INTERVAL_MS,
+            "sample_count": self.sample_count,
+            "folded_stacks": [f"{stack} {count}" for stack, count in stacks]
+        }
+
+class StackSampler:
+    """Samples the event loop and tree worker threads while profiled requests are running.
+
+    Each folded stack starts with the thread name, so work offloaded through
+    run_tree_work shows up next to the event loop. Workers in process mode can't be
+    sampled from here. Samples are shared by every profiled request in flight, so
+    concurrent requests see each other's frames; the phase timings are per request.
+    """
+
+    def __init__(self, interval: float):
+        self.interval = interval
+        self.active = set()
+        self.lock = threading.Lock()
+        self.thread = None
+        self.target_thread_id = None
+
+    def start(self, profile: RequestProfile):
+        with self.lock:
+            self.active.add(profile)
+            if self.thread is None:
+                self.target_thread_id = threading.get_ident()
+                self.thread = threading.Thread(target=self._run, name="stack-sampler", daemon=True)
+                self.thread.start()
+
+    def stop(self, profile: RequestProfile):
+        with self.lock:
+            self.active.discard(profile)
+
+    def _sample(self) -> List[str]:
+        names = {self.target_thread_id: "event-loop"}
+        for thread in threading.enumerate():
+            if thread.name.startswith("tree-worker"):
+                names[thread.ident] = thread.name
+        stacks = []
+        for thread_id, frame in sys._current_frames().items():
+            # An idle pool thread sits in _worker, blocked on the work queue
+            if thread_id in names and not (thread_id != self.target_thread_id and frame.f_code.co_name == "_worker"):
+                stacks.append(f"{names[thread_id]};{self._fold(frame)}")
+        return stacks
+
+    def _run(self):
+        while True:
+            stacks = self._sample()
+            with self.lock:
+                if not self.active:
+                    self.thread = None
+                    return
+                for profile in self.active:
+                    for stack in stacks:
+                        profile.stacks[stack] = profile.stacks.get(stack, 0) + 1
+                    profile.sample_count += len(stacks)
+            time.sleep(self.interval)
+
+    @staticmethod
+    def _fold(frame) -> str:
+        entries = []
+        while frame is not None:
+            code = frame.f_code
+            entries.append(f"{os.path.basename(code.co_filename)}:{code.co_name}:{frame.f_lineno}")
+            frame = frame.f_back
+        return ";".join(reversed(entries))
+
+current_profile: contextvars.ContextVar = contextvars.ContextVar("current_profile", default=None)
+stack_sampler = StackSampler(PROFILE_SAMPLE_INTERVAL_MS / 1000)
+slowest_profiles = []  # min-heap of (duration, sequence, profile)
+recent_profiles = deque(maxlen=PROFILE_SLOWEST_COUNT)  # explicitly profiled or sampled requests
+profile_sequence = 0
+PROFILE_EXCLUDED_PATHS = ("/health", "/metrics", "/admin/profiles")
+
+@contextlib.contextmanager
+def profile_phase(name: str):
+    """Add the time spent in the block to the current request's phase timings"""
+    profile = current_profile.get()
+    if profile is None:
+        yield
+        return
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        profile.add_phase(name, time.perf_counter() - started)
+
+def has_admin_token(request: Request) -> bool:
+    """Whether the request carries the configured admin token"""
+    token = request.headers.get("X-Admin-Token")
+    return bool(PROFILE_ADMIN_TOKEN) and token is not None and hmac.compare_digest(token, PROFILE_ADMIN_TOKEN)
+
+def record_profile(profile: RequestProfile):
+    """Keep the profile if it is among the slowest, or if it was explicitly profiled"""
+    global profile_sequence
+    profile_sequence += 1
+    entry = (profile.duration, profile_sequence, profile)
+    if len(slowest_profiles) < PROFILE_SLOWEST_COUNT:
+        heapq.heappush(slowest_profiles, entry)
+    elif slowest_profiles and profile.duration > slowest_profiles[0][0]:
+        heapq.heapreplace(slowest_profiles, entry)
+    if profile.sampled:
+        recent_profiles.append(profile)
+
+@app.middleware("http")
+async def capture_request_profile(request: Request, call_next):
+    """Time each request's phases and sample stacks when profiling is requested"""
+    if request.url.path.startswith(PROFILE_EXCLUDED_PATHS):
+        return await call_next(request)
+
+    # Only admins may force stack sampling; PROFILE_SAMPLE_RATE covers everyone else
+    requested = request.headers.get(PROFILE_HEADER) == "1" and has_admin_token(request)
+    sampled = requested or random.random() < PROFILE_SAMPLE_RATE
+    profile = RequestProfile(request.method, request.url.path, sampled)
+    token = current_profile.set(profile)
+    if sampled:
+        stack_sampler.start(profile)
+
+    started = time.perf_counter()
+    try:
+        response = await call_next(request)
+        profile.status = response.status_code
+        if sampled:
+            response.headers["X-Dot-Profile-Id"] = profile.id
+        return response
+    finally:
+        if sampled:
+            stack_sampler.stop(profile)
+        current_profile.reset(token)
+        profile.duration = time.perf_counter() - started
+        # Request parsing, response serialisation and anything not in a named phase
+        profile.add_phase("framework_and_other", max(0.0, profile.duration - sum(profile.phases.values())))
+        record_profile(profile)
+
 # Pydantic models
 class ChatRequest(BaseModel):
     message: str
@@ -49,12 +498,22 @@ class NodeRequest(BaseModel):
     parent_id: Optional[str] = None
 
 class UpdateNodeRequest(BaseModel):
-    node_id: str
+    node_id: Optional[str] = None  # the path parameter is authoritative
     updates: Dict[str, Any]
 
 class DeleteNodeRequest(BaseModel):
     node_id: str
 
+class BatchOperation(BaseModel):
+    op: Literal["create", "update", "delete", "move"]
+    node_id: str
+    node: Optional[Dict[str, Any]] = None
+    updates: Optional[Dict[str, Any]] = None
+    parent_id: Optional[str] = None
+
+class BatchRequest(BaseModel):
+    operations: List[BatchOperation]
+
 class ChatResponse(BaseModel):
     response: str
     timestamp: str
@@ -64,6 +523,38 @@ class HealthResponse(BaseModel):
     timestamp: str
     version: str
 
+# Worker pool for CPU-heavy tree work, so large trees don't block the event loop
+tree_executor = None
+
+def get_tree_executor():
+    """Create the worker pool on first use"""
+    global tree_executor
+    if tree_executor is None:
+        if TREE_WORKER_MODE == "process":
+            tree_executor = ProcessPoolExecutor(max_workers=TREE_WORKER_COUNT)
+        else:
+            tree_executor = ThreadPoolExecutor(max_workers=TREE_WORKER_COUNT, thread_name_prefix="tree-worker")
+        logger.info(f"Started {TREE_WORKER_MODE} pool with {TREE_WORKER_COUNT} workers for tree work")
+    return tree_executor
+
+async def run_tree_work(func, *args, node_count: int = 0):
+    """Run tree work inline for small trees, or in the worker pool above the threshold
+
+    Arguments must not be mutated by the caller while the work runs, and must be
+    picklable when TREE_WORKER_MODE is "process".
+    """
+    if node_count < TREE_OFFLOAD_THRESHOLD:
+        return func(*args)
+
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(get_tree_executor(), functools.partial(func, *args))
+
+def context_node_count(context: Optional[Dict[str, Any]]) -> int:
+    """Number of nodes in a chat context's product tree"""
+    if not context or not context.get('productTree'):
+        return 0
+    return len(context['productTree'].get('nodes', []))
+
 # Internal AI model simulation
 class InternalAIModel:
     def __init__(self):
@@ -72,6 +563,11 @@ class InternalAIModel:
         
     async def generate_response(self, message: str, context: Dict[str, Any] = None) -> str:
         """Generate a response using internal AI logic"""
+        with profile_phase("analysis"):
+            return await run_tree_work(self._route_message, message, context, node_count=context_node_count(context))
+    
+    def _route_message(self, message: str, context: Dict[str, Any] = None) -> str:
+        """Pick the analysis that matches the message and run it"""
         
         # Simple keyword-based responses for product tree management
         message_lower = message.lower()
@@ -425,20 +921,24 @@ ai_model = InternalAIModel()
 # Local AI Model Integration
 async def call_local_model(prompt: str, context: Dict[str, Any] = None) -> str:
     """Call local AI model for AI-powered responses"""
+    api = "ollama" if LOCAL_MODEL_ENDPOINT.endswith("11434") else "openai"
     try:
         if not AI_INTEGRATION_ENABLED:
             return None
             
         # Build context-aware prompt
-        enhanced_prompt = build_context_prompt(prompt, context)
+        with profile_phase("prompt_build"):
+            enhanced_prompt = await run_tree_work(build_context_prompt, prompt, context, node_count=context_node_count(context))
+        started = time.perf_counter()
         
         # Try Ollama first (most common local model server)
-        if LOCAL_MODEL_ENDPOINT.endswith("11434"):
+        if api == "ollama":
             # Ollama format
             data = {
                 "model": LOCAL_MODEL_NAME,
                 "prompt": enhanced_prompt,
                 "stream": False,
+                "keep_alive": ollama_keep_alive(),
                 "options": {
                     "temperature": 0.7,
                     "top_p": 0.9,
@@ -447,15 +947,19 @@ async def call_local_model(prompt: str, context: Dict[str, Any] = None) -> str:
             }
             
             async with httpx.AsyncClient(timeout=LOCAL_MODEL_TIMEOUT) as client:
-                response = await client.post(
-                    f"{LOCAL_MODEL_ENDPOINT}/api/generate",
-                    json=data
-                )
+                with profile_phase("model_wait"):
+                    response = await client.post(
+                        f"{LOCAL_MODEL_ENDPOINT}/api/generate",
+                        json=data
+                    )
+                MODEL_REQUEST_LATENCY.labels(model=LOCAL_MODEL_NAME, api=api).observe(time.perf_counter() - started)
                 
                 if response.status_code == 200:
+                    mark_model_used()
                     result = response.json()
                     return result.get("response", "")
                 else:
+                    MODEL_ERRORS.labels(model=LOCAL_MODEL_NAME, api=api, reason="http_status").inc()
                     logger.error(f"Ollama API error: {response.status_code} - {response.text}")
         
         # Try generic OpenAI-compatible format (for LM Studio, vLLM, etc.)
@@ -471,20 +975,30 @@ async def call_local_model(prompt: str, context: Dict[str, Any] = None) -> str:
             }
             
             async with httpx.AsyncClient(timeout=LOCAL_MODEL_TIMEOUT) as client:
-                response = await client.post(
-                    f"{LOCAL_MODEL_ENDPOINT}/v1/chat/completions",
-                    json=data
-                )
+                with profile_phase("model_wait"):
+                    response = await client.post(
+                        f"{LOCAL_MODEL_ENDPOINT}/v1/chat/completions",
+                        json=data
+                    )
+                MODEL_REQUEST_LATENCY.labels(model=LOCAL_MODEL_NAME, api=api).observe(time.perf_counter() - started)
                 
                 if response.status_code == 200:
+                    mark_model_used()
                     result = response.json()
                     return result.get("choices", [{}])[0].get("message", {}).get("content", "")
                 else:
+                    MODEL_ERRORS.labels(model=LOCAL_MODEL_NAME, api=api, reason="http_status").inc()
                     logger.error(f"OpenAI-compatible API error: {response.status_code} - {response.text}")
         
         return None
         
+    except httpx.TimeoutException as e:
+        MODEL_ERRORS.labels(model=LOCAL_MODEL_NAME, api=api, reason="timeout").inc()
+        logger.error(f"Local model call timed out: {e}")
+        return None
+        
     except Exception as e:
+        MODEL_ERRORS.labels(model=LOCAL_MODEL_NAME, api=api, reason="exception").inc()
         logger.error(f"Local model call failed: {e}")
         return None
 
@@ -601,6 +1115,86 @@ async def test_local_model_connection() -> Dict[str, Any]:
             "endpoint": LOCAL_MODEL_ENDPOINT
         }
 
+# Model warm-up and keep-alive
+model_state = {
+    "ready": False,
+    "last_used": None,  # time.monotonic() of the last successful model call or ping
+    "last_warmed_at": None,
+    "load_seconds": None,
+    "error": None
+}
+
+def ollama_keep_alive():
+    """LOCAL_MODEL_KEEP_ALIVE as Ollama expects it: a number of seconds or a duration string"""
+    try:
+        return int(LOCAL_MODEL_KEEP_ALIVE)
+    except ValueError:
+        return LOCAL_MODEL_KEEP_ALIVE
+
+def mark_model_used():
+    """Record that the model just answered, so idle pings can be skipped"""
+    model_state["ready"] = True
+    model_state["last_used"] = time.monotonic()
+    model_state["error"] = None
+    MODEL_READY.set(1)
+
+async def warm_local_model() -> bool:
+    """Load the local model, or refresh its keep-alive, without generating a full response"""
+    api = "ollama" if LOCAL_MODEL_ENDPOINT.endswith("11434") else "openai"
+    started = time.perf_counter()
+    try:
+        async with httpx.AsyncClient(timeout=MODEL_WARMUP_TIMEOUT) as client:
+            if api == "ollama":
+                # An empty prompt makes Ollama load the model and return immediately
+                response = await client.post(
+                    f"{LOCAL_MODEL_ENDPOINT}/api/generate",
+                    json={"model": LOCAL_MODEL_NAME, "prompt": "", "stream": False, "keep_alive": ollama_keep_alive()}
+                )
+            else:
+                response = await client.post(
+                    f"{LOCAL_MODEL_ENDPOINT}/v1/chat/completions",
+                    json={"model": LOCAL_MODEL_NAME, "messages": [{"role": "user", "content": "ping"}], "max_tokens": 1}
+                )
+
+        if response.status_code != 200:
+            raise RuntimeError(f"HTTP {response.status_code} - {response.text[:200]}")
+
+        load_seconds = time.perf_counter() - started
+        if api == "ollama":
+            # Ollama reports the time spent loading the model in nanoseconds
+            load_seconds = response.json().get("load_duration", load_seconds * 1e9) / 1e9
+        if not model_state["ready"]:
+            logger.info(f"Local model {LOCAL_MODEL_NAME} is warm (loaded in {load_seconds:.2f}s)")
+        mark_model_used()
+        model_state["last_warmed_at"] = datetime.now().isoformat()
+        model_state["load_seconds"] = round(load_seconds, 3)
+        return True
+
+    except Exception as e:
+        MODEL_ERRORS.labels(model=LOCAL_MODEL_NAME, api=api, reason="warmup").inc()
+        if model_state["ready"] or model_state["error"] is None:
+            logger.warning(f"Local model warm-up failed: {e}")
+        model_state["ready"] = False
+        model_state["error"] = str(e) or type(e).__name__
+        MODEL_READY.set(0)
+        return False
+
+async def keep_local_model_warm():
+    """Preload the model, then ping it whenever it has been idle for MODEL_KEEP_WARM_INTERVAL"""
+    while True:
+        if not await warm_local_model():
+            await asyncio.sleep(MODEL_WARMUP_RETRY_INTERVAL)
+            continue
+        if MODEL_KEEP_WARM_INTERVAL <= 0:
+            return
+
+        # Real chat traffic keeps the model resident too, so only ping after an idle interval
+        while True:
+            idle = time.monotonic() - model_state["last_used"]
+            if idle >= MODEL_KEEP_WARM_INTERVAL:
+                break
+            await asyncio.sleep(MODEL_KEEP_WARM_INTERVAL - idle)
+
 @app.get("/health", response_model=HealthResponse)
 async def health_check():
     """Health check endpoint"""
@@ -610,6 +1204,63 @@ async def health_check():
         version="1.0.0"
     )
 
+@app.get("/ready")
+async def readiness_check():
+    """Readiness probe: 503 until the local model is loaded, unlike /health which only reports liveness"""
+    if not AI_INTEGRATION_ENABLED or not MODEL_WARMUP_ENABLED:
+        return {"status": "ready", "model": None}
+
+    body = {
+        "status": "ready" if model_state["ready"] else "warming",
+        "model": LOCAL_MODEL_NAME,
+        "endpoint": LOCAL_MODEL_ENDPOINT,
+        "last_warmed_at": model_state["last_warmed_at"],
+        "load_seconds": model_state["load_seconds"],
+        "error": model_state["error"]
+    }
+    return FastJSONResponse(body, status_code=200 if model_state["ready"] else 503)
+
+@app.get("/metrics")
+async def metrics():
+    """Prometheus metrics endpoint"""
+    registry = REGISTRY
+    if os.getenv("PROMETHEUS_MULTIPROC_DIR"):
+        registry = CollectorRegistry()
+        multiprocess.MultiProcessCollector(registry)
+    return Response(content=generate_latest(registry), media_type=CONTENT_TYPE_LATEST)
+
+def check_admin_token(request: Request):
+    """Reject admin requests without the configured token; without one the admin endpoints are off"""
+    if not PROFILE_ADMIN_TOKEN:
+        raise HTTPException(status_code=404, detail="Admin endpoints are disabled; set PROFILE_ADMIN_TOKEN to enable them")
+    if not has_admin_token(request):
+        raise HTTPException(status_code=403, detail="Invalid admin token")
+
+@app.get("/admin/profiles")
+async def list_request_profiles(request: Request):
+    """List the slowest requests and the most recent profiled requests"""
+    check_admin_token(request)
+    return {
+        "slowest": [profile.summary() for _, _, profile in sorted(slowest_profiles, reverse=True)],
+        "recent": [profile.summary() for profile in reversed(recent_profiles)]
+    }
+
+@app.get("/admin/profiles/{profile_id}")
+async def get_request_profile(profile_id: str, request: Request):
+    """Full profile of a captured request, with folded stacks for flame graph tools"""
+    check_admin_token(request)
+    for profile in [entry[2] for entry in slowest_profiles] + list(recent_profiles):
+        if profile.id == profile_id:
+            return profile.details()
+    raise HTTPException(status_code=404, detail=f"Profile {profile_id} not found")
+
+async def monitor_event_loop_lag():
+    """Measure how late the event loop wakes up a sleeping task"""
+    while True:
+        started = time.perf_counter()
+        await asyncio.sleep(EVENT_LOOP_LAG_INTERVAL)
+        EVENT_LOOP_LAG.observe(max(0.0, time.perf_counter() - started - EVENT_LOOP_LAG_INTERVAL))
+
 @app.post("/ai/chat", response_model=ChatResponse)
 async def chat_with_ai(request: ChatRequest):
     """Chat with the local AI model"""
@@ -621,6 +1272,7 @@ async def chat_with_ai(request: ChatRequest):
             ai_response = await call_local_model(request.message, request.context)
             if ai_response:
                 logger.info("Using local AI model response")
+                CHAT_RESPONSES.labels(engine="local").inc()
                 return ChatResponse(
                     response=ai_response,
                     timestamp=datetime.now().isoformat()
@@ -628,6 +1280,7 @@ async def chat_with_ai(request: ChatRequest):
         
         # Fallback to internal analysis engine
         logger.info("Using internal analysis engine")
+        CHAT_RESPONSES.labels(engine="internal").inc()
         response = await ai_model.generate_response(
             request.message, 
             request.context
@@ -671,265 +1324,1435 @@ async def test_ai_connection():
     """Test connection to local AI model"""
     return await test_local_model_connection()
 
-# Global product tree storage
-current_product_tree = None
+# Versioned product tree storage
+class SnapshotCache:
+    """LRU of data derived from snapshots, such as the materialised tree and the
+    generated XML and debug documents.
 
-@app.post("/product-tree/import")
-async def import_product_tree(tree_data: dict):
-    """Import a product tree"""
-    global current_product_tree
-    current_product_tree = tree_data
-    return {"success": True, "message": f"Imported {len(tree_data.get('nodes', []))} nodes"}
+    Derived data is O(N) per version, so only the most recently used entries are
+    kept instead of one per retained version. Tree work threads share the cache.
+    """
 
-@app.get("/product-tree/debug")
-async def debug_product_tree():
-    """Debug endpoint to analyze product tree structure"""
+    def __init__(self, max_entries: int):
+        self.max_entries = max_entries
+        self.entries = OrderedDict()  # (snapshot key, name) -> value
+        self.lock = threading.Lock()
+
+    def get(self, key):
+        with self.lock:
+            value = self.entries.get(key)
+            if value is not None:
+                self.entries.move_to_end(key)
+            return value
+
+    def put(self, key, value):
+        with self.lock:
+            self.entries[key] = value
+            self.entries.move_to_end(key)
+            while len(self.entries) > self.max_entries:
+                self.entries.popitem(last=False)
+
+snapshot_cache = SnapshotCache(TREE_CACHE_SIZE)
+snapshot_keys = itertools.count()
+
+@contextlib.contextmanager
+def gc_paused():
+    """Pause cyclic garbage collection while bulk-building acyclic tree data
+
+    Allocating O(N) containers otherwise triggers repeated full collections over
+    every live tree, which costs more than the build itself on large trees.
+    """
+    was_enabled = gc.isenabled()
+    gc.disable()
     try:
-        global current_product_tree
-        if not current_product_tree:
-            return {"error": "No product tree loaded"}
+        yield
+    finally:
+        if was_enabled:
+            gc.enable()
+
+class TreeSnapshot:
+    """An immutable version of the product tree.
+
+    Nodes and edges live in persistent maps, so deriving a new version copies only
+    the O(log N) path to each changed entry and shares everything else with its
+    predecessor. Stored node and edge dicts are never mutated.
+    """
+
+    def __init__(self, version, nodes, incoming, children, positions, next_position, metadata, description):
+        self.version = version
+        self.nodes = nodes  # node id -> node dict
+        self.incoming = incoming  # node id -> tuple of (position, edge) pointing at the node
+        self.children = children  # node id -> tuple of child ids in edge order
+        self.positions = positions  # node id -> position, keeps node order stable
+        self.next_position = next_position
+        self.metadata = metadata  # other top-level keys from the imported tree
+        self.description = description
+        self.created_at = datetime.now().isoformat()
+        self.key = next(snapshot_keys)  # identifies this snapshot in snapshot_cache
+        self.base_version = None  # version the delta applies to, for snapshots derived by a batch
+        self.delta = None  # changed map entries relative to base_version, see apply_delta()
+
+    @classmethod
+    def from_tree(cls, tree: Dict[str, Any], version: int, description: str,
+                  node_positions=None, edge_positions=None, next_position=None) -> "TreeSnapshot":
+        """Build a snapshot from a plain {nodes, edges} tree
+
+        Nodes and then edges are numbered in list order unless a checkpoint
+        supplies their stored positions.
+        """
+        tree_nodes = tree.get('nodes') or []
+        tree_edges = tree.get('edges') or []
+        if node_positions is None:
+            node_positions = range(len(tree_nodes))
+            edge_positions = range(len(tree_nodes), len(tree_nodes) + len(tree_edges))
+            next_position = len(tree_nodes) + len(tree_edges)
+
+        nodes = {}
+        positions = {}
+        for node, position in zip(tree_nodes, node_positions):
+            nodes[node['id']] = node
+            positions[node['id']] = position
+
+        incoming = {}
+        children = {}
+        for edge, position in zip(tree_edges, edge_positions):
+            incoming.setdefault(edge.get('to'), []).append((position, edge))
+            children.setdefault(edge.get('from'), []).append(edge.get('to'))
+
+        return cls(
+            version,
+            pmap(nodes),
+            pmap({node_id: tuple(entries) for node_id, entries in incoming.items()}),
+            pmap({node_id: tuple(child_ids) for node_id, child_ids in children.items()}),
+            pmap(positions),
+            next_position,
+            {key: value for key, value in tree.items() if key not in ('nodes', 'edges')},
+            description
+        )
+
+    @classmethod
+    def from_checkpoint(cls, data: Dict[str, Any], version: int, description: str) -> "TreeSnapshot":
+        """Rebuild a snapshot saved by checkpoint(), with its positions unchanged"""
+        return cls.from_tree(data['tree'], version, description,
+                             data['node_positions'], data['edge_positions'], data['next_position'])
+
+    def checkpoint(self) -> Dict[str, Any]:
+        """The plain tree plus the positions of its nodes and edges
+
+        Deltas recorded against this version use these positions, so they must
+        survive a reload for the replayed versions to keep the writer's order.
+        """
+        tree = self.as_dict()
+        return {
+            "tree": tree,
+            "node_positions": [self.positions[node['id']] for node in tree['nodes']],
+            "edge_positions": sorted(entry[0] for entries in self.incoming.values() for entry in entries),
+            "next_position": self.next_position
+        }
+
+    def with_version(self, version: int, description: str) -> "TreeSnapshot":
+        """Return the same tree content under a new version number"""
+        return TreeSnapshot(version, self.nodes, self.incoming, self.children, self.positions,
+                            self.next_position, self.metadata, description)
+
+    def apply_delta(self, delta: Dict[str, Any], version: int, description: str) -> "TreeSnapshot":
+        """Derive the next version from a delta recorded by a batch
+
+        A delta lists [key, value] pairs for every changed entry of each map, with a
+        null value for removed entries, so replaying it costs O(changes * log N).
+        """
+        def patch(mapping, entries, convert):
+            for key, value in entries:
+                mapping = mapping.discard(key) if value is None else mapping.set(key, convert(value))
+            return mapping
+
+        def same(value):
+            return value
+
+        snapshot = TreeSnapshot(
+            version,
+            patch(self.nodes, delta['nodes'], same),
+            patch(self.incoming, delta['incoming'], lambda entries: tuple(tuple(entry) for entry in entries)),
+            patch(self.children, delta['children'], tuple),
+            patch(self.positions, delta['positions'], same),
+            delta['next_position'],
+            self.metadata,
+            description
+        )
+        snapshot.base_version = self.version
+        snapshot.delta = delta
+        return snapshot
+
+    def as_dict(self) -> Dict[str, Any]:
+        """Materialise the plain {nodes, edges} tree, cached in snapshot_cache"""
+        tree = snapshot_cache.get((self.key, "tree"))
+        if tree is None:
+            with TREE_REBUILD_LATENCY.labels(operation="materialise").time():
+                node_ids = sorted(self.nodes.keys(), key=lambda node_id: self.positions[node_id])
+                edge_entries = sorted(
+                    (entry for entries in self.incoming.values() for entry in entries),
+                    key=lambda entry: entry[0]
+                )
+                tree = {
+                    **self.metadata,
+                    "nodes": [self.nodes[node_id] for node_id in node_ids],
+                    "edges": [edge for _, edge in edge_entries]
+                }
+            snapshot_cache.put((self.key, "tree"), tree)
+        return tree
+
+    def summary(self) -> Dict[str, Any]:
+        return {
+            "version": self.version,
+            "created_at": self.created_at,
+            "description": self.description,
+            "node_count": len(self.nodes)
+        }
+
+class TreeHistory:
+    """Keeps the most recent tree snapshots for pinned reads and reverts"""
+
+    def __init__(self, max_versions: int):
+        self.max_versions = max_versions
+        self.snapshots = {}  # version -> snapshot
+        self.latest_version = 0
+        self.epoch = uuid.uuid4().hex[:8]  # distinguishes version numbers across restarts in ETags
+
+    def current(self) -> Optional[TreeSnapshot]:
+        return self.snapshots.get(self.latest_version)
+
+    async def get(self, version: int) -> Optional[TreeSnapshot]:
+        return self.snapshots.get(version)
+
+    def next_version(self) -> int:
+        return self.latest_version + 1
+
+    async def summaries(self) -> List[Dict[str, Any]]:
+        return [self.snapshots[version].summary() for version in sorted(self.snapshots, reverse=True)]
+
+    def retain(self, snapshot: TreeSnapshot):
+        """Keep a snapshot in memory, dropping the oldest beyond max_versions"""
+        self.snapshots[snapshot.version] = snapshot
+        while len(self.snapshots) > self.max_versions:
+            del self.snapshots[min(self.snapshots)]
+
+    async def commit(self, snapshot: TreeSnapshot, events: Optional[List[Dict[str, Any]]] = None):
+        self.latest_version = snapshot.version
+        self.retain(snapshot)
+        TREE_NODES.set(len(snapshot.nodes))
+        TREE_VERSION.set(snapshot.version)
+
+    @contextlib.asynccontextmanager
+    async def write_lock(self):
+        """Serialise writers across processes; a single process needs no lock"""
+        yield
+
+    async def sync(self) -> List[Dict[str, Any]]:
+        """Pull versions committed elsewhere; a single process has none"""
+        return []
+
+class SharedTreeHistory(TreeHistory):
+    """Tree history shared by several uvicorn workers through a SQLite store file.
+
+    Each worker keeps its own in-memory snapshots for fast reads and pulls newer
+    versions from the store when they appear. Writers hold the store's write lock,
+    so SQLite acts as the single coordinator for commits from every worker.
+
+    Batches are stored as deltas against the previous version; imports, reverts and
+    every TREE_STORE_CHECKPOINT_INTERVAL versions store a full checkpoint. Workers
+    replay deltas onto their in-memory snapshots, so following another worker's
+    batch costs O(changes). Store I/O runs in threads, off the event loop.
+    """
+
+    def __init__(self, max_versions: int, path: str):
+        super().__init__(max_versions)
+        self.path = path
+        self._write_connection = None
+        self.sync_lock = asyncio.Lock()
+
+        with contextlib.closing(self._connect()) as connection:
+            connection.execute("PRAGMA journal_mode=WAL")
+            connection.execute(
+                "CREATE TABLE IF NOT EXISTS versions "
+                "(version INTEGER PRIMARY KEY, created_at TEXT, description TEXT, node_count INTEGER, "
+                "kind TEXT, base_version INTEGER, data BLOB)"
+            )
+            connection.execute("CREATE TABLE IF NOT EXISTS changes (version INTEGER, event TEXT)")
+            connection.execute("CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value TEXT)")
+            connection.execute("INSERT OR IGNORE INTO meta (key, value) VALUES ('epoch', ?)", (self.epoch,))
+            self.epoch = connection.execute("SELECT value FROM meta WHERE key = 'epoch'").fetchone()[0]
+
+    def _connect(self):
+        # Connections are opened on the event loop and used from store I/O threads
+        return sqlite3.connect(self.path, timeout=TREE_STORE_LOCK_TIMEOUT, isolation_level=None, check_same_thread=False)
+
+    @staticmethod
+    def _replay(base: Optional[TreeSnapshot], rows) -> List[TreeSnapshot]:
+        """Rebuild snapshots from stored version rows, starting from base where possible"""
+        snapshots = []
+        snapshot = base
+        for version, created_at, description, kind, base_version, data in rows:
+            if kind == "checkpoint":
+                with gc_paused():
+                    snapshot = TreeSnapshot.from_checkpoint(orjson.loads(data), version, description)
+            elif snapshot is not None and snapshot.version == base_version:
+                snapshot = snapshot.apply_delta(orjson.loads(data), version, description)
+            else:
+                # The delta's base is not available; wait for the next checkpoint
+                snapshot = None
+                continue
+            snapshot.created_at = created_at
+            snapshots.append(snapshot)
+        return snapshots
+
+    def _read_snapshot(self, version: int, base: Optional[TreeSnapshot]) -> Optional[TreeSnapshot]:
+        """Load a version from its nearest checkpoint, or from base if that is newer"""
+        with contextlib.closing(self._connect()) as connection:
+            connection.execute("BEGIN")
+            checkpoint = connection.execute(
+                "SELECT MAX(version) FROM versions WHERE kind = 'checkpoint' AND version <= ?", (version,)
+            ).fetchone()[0]
+            if base is None or checkpoint is not None and checkpoint > base.version:
+                base, start = None, checkpoint
+            else:
+                start = base.version + 1
+            rows = connection.execute(
+                "SELECT version, created_at, description, kind, base_version, data FROM versions "
+                "WHERE version >= ? AND version <= ? ORDER BY version", (start or 0, version)
+            ).fetchall()
+            connection.execute("COMMIT")
+
+        snapshots = self._replay(base, rows)
+        if snapshots and snapshots[-1].version == version:
+            return snapshots[-1]
+        return None
+
+    async def get(self, version: int) -> Optional[TreeSnapshot]:
+        snapshot = self.snapshots.get(version)
+        if snapshot is None and 0 < version <= self.latest_version:
+            older = [known for known in self.snapshots if known < version]
+            base = self.snapshots[max(older)] if older else None
+            snapshot = await asyncio.to_thread(self._read_snapshot, version, base)
+            if snapshot is not None:
+                self.retain(snapshot)
+        return snapshot
+
+    def _read_summaries(self) -> List[Dict[str, Any]]:
+        with contextlib.closing(self._connect()) as connection:
+            rows = connection.execute(
+                "SELECT version, created_at, description, node_count FROM versions "
+                "WHERE version > (SELECT MAX(version) FROM versions) - ? ORDER BY version DESC",
+                (self.max_versions,)
+            ).fetchall()
+        return [
+            {"version": version, "created_at": created_at, "description": description, "node_count": node_count}
+            for version, created_at, description, node_count in rows
+        ]
+
+    async def summaries(self) -> List[Dict[str, Any]]:
+        return await asyncio.to_thread(self._read_summaries)
+
+    def _read_since(self, base: Optional[TreeSnapshot]):
+        """Replay versions committed after base, returning (snapshots, event rows)"""
+        known = base.version if base else 0
+        with contextlib.closing(self._connect()) as connection:
+            connection.execute("BEGIN")
+            rows = connection.execute(
+                "SELECT version, created_at, description, kind, base_version, data FROM versions "
+                "WHERE version > ? ORDER BY version", (known,)
+            ).fetchall()
+            event_rows = connection.execute(
+                "SELECT version, event FROM changes WHERE version > ? ORDER BY rowid", (known,)
+            ).fetchall() if rows else []
+            connection.execute("COMMIT")
+
+        with TREE_REBUILD_LATENCY.labels(operation="sync").time():
+            return self._replay(base, rows), event_rows
+
+    async def sync(self) -> List[Dict[str, Any]]:
+        """Load versions other workers committed, returning the missed events"""
+        async with self.sync_lock:
+            known = self.latest_version
+            snapshots, event_rows = await asyncio.to_thread(self._read_since, self.current())
+            if not snapshots:
+                return []
+
+        events = [json.loads(event) for _, event in event_rows]
+        if not event_rows or event_rows[0][0] > known + 1:
+            # Some events were pruned before this worker saw them
+            events.insert(0, {"version": snapshots[-1].version, "type": "resync"})
+
+        for snapshot in snapshots[-self.max_versions:]:
+            await super().commit(snapshot)
+        return events
+
+    @contextlib.asynccontextmanager
+    async def write_lock(self):
+        """Hold the store's write lock for the duration of a commit"""
+        connection = self._connect()
+        try:
+            await asyncio.to_thread(connection.execute, "BEGIN IMMEDIATE")
+            self._write_connection = connection
+            yield
+            await asyncio.to_thread(connection.execute, "COMMIT")
+        except BaseException:
+            if connection.in_transaction:
+                connection.execute("ROLLBACK")
+            raise
+        finally:
+            self._write_connection = None
+            connection.close()
+
+    def _write_version(self, connection, snapshot: TreeSnapshot, events: List[Dict[str, Any]]):
+        last_checkpoint = connection.execute(
+            "SELECT MAX(version) FROM versions WHERE kind = 'checkpoint'"
+        ).fetchone()[0]
+        if (
+            snapshot.delta is not None
+            and snapshot.base_version == self.latest_version
+            and last_checkpoint is not None
+            and snapshot.version - last_checkpoint < TREE_STORE_CHECKPOINT_INTERVAL
+        ):
+            kind, data = "delta", orjson.dumps(snapshot.delta)
+        else:
+            kind, data = "checkpoint", orjson.dumps(snapshot.checkpoint())
+
+        connection.execute(
+            "INSERT INTO versions (version, created_at, description, node_count, kind, base_version, data) "
+            "VALUES (?, ?, ?, ?, ?, ?, ?)",
+            (snapshot.version, snapshot.created_at, snapshot.description, len(snapshot.nodes),
+             kind, snapshot.base_version, data)
+        )
+        connection.executemany(
+            "INSERT INTO changes (version, event) VALUES (?, ?)",
+            [(event['version'], json.dumps(event)) for event in events]
+        )
+
+        # Keep the checkpoint the oldest retained version is replayed from
+        oldest_kept = snapshot.version - self.max_versions
+        base_checkpoint = connection.execute(
+            "SELECT MAX(version) FROM versions WHERE kind = 'checkpoint' AND version <= ?", (oldest_kept + 1,)
+        ).fetchone()[0]
+        if base_checkpoint is not None:
+            connection.execute("DELETE FROM versions WHERE version < ?", (base_checkpoint,))
+        connection.execute("DELETE FROM changes WHERE version <= ?", (oldest_kept,))
+
+    async def commit(self, snapshot: TreeSnapshot, events: Optional[List[Dict[str, Any]]] = None):
+        connection = self._write_connection
+        if connection is None:
+            raise RuntimeError("Shared tree commits must happen inside write_lock()")
+
+        await asyncio.to_thread(self._write_version, connection, snapshot, events or [])
+        await super().commit(snapshot, events)
+
+if TREE_STORE_PATH:
+    tree_history = SharedTreeHistory(TREE_HISTORY_SIZE, TREE_STORE_PATH)
+else:
+    tree_history = TreeHistory(TREE_HISTORY_SIZE)
+    if int(os.getenv("WEB_CONCURRENCY", "1")) > 1:
+        logger.warning("WEB_CONCURRENCY > 1 without TREE_STORE_PATH: each worker will keep its own product tree")
+tree_write_mutex = asyncio.Lock()  # serialises writers within this worker
+
+async def sync_tree_state():
+    """Pull versions committed by other workers and replay their change events here"""
+    previous_version = tree_history.latest_version
+    events = await tree_history.sync()
+    if events:
+        update_duplicate_index(previous_version, tree_history.current(), events)
+    for event in events:
+        publish_tree_event(event)
+
+@contextlib.asynccontextmanager
+async def tree_write_lock():
+    """Hold the write lock with this worker synced to the latest version"""
+    async with tree_write_mutex, tree_history.write_lock():
+        await sync_tree_state()
+        yield
+
+async def resolve_tree_snapshot(version: Optional[int] = None) -> Optional[TreeSnapshot]:
+    """Return the snapshot for a pinned version, or the current one"""
+    await sync_tree_state()
+    if version is None:
+        return tree_history.current()
+    return await tree_history.get(version)
+
+def tree_etag(snapshot: TreeSnapshot, variant: str) -> str:
+    """Weak ETag for a representation of a tree version"""
+    return f'W/"{tree_history.epoch}-{snapshot.version}-{variant}"'
+
+def etag_headers(etag: str) -> Dict[str, str]:
+    return {"ETag": etag, "Cache-Control": "no-cache"}
+
+def not_modified(request: Request, etag: str) -> Optional[Response]:
+    """Return a 304 response if the client's If-None-Match already covers this ETag"""
+    if_none_match = request.headers.get("if-none-match")
+    if not if_none_match:
+        return None
+
+    opaque_tag = etag.removeprefix("W/")
+    for candidate in if_none_match.split(","):
+        candidate = candidate.strip()
+        if candidate == "*" or candidate.removeprefix("W/") == opaque_tag:
+            return Response(status_code=304, headers=etag_headers(etag))
+    return None
+
+async def memoised_artifact(snapshot: TreeSnapshot, name: str, func):
+    """Build a document for a snapshot once and reuse it while it stays in snapshot_cache"""
+    artifact = snapshot_cache.get((snapshot.key, name))
+    if artifact is None:
+        artifact = await run_tree_work(func, snapshot, node_count=len(snapshot.nodes))
+        snapshot_cache.put((snapshot.key, name), artifact)
+    return artifact
+
+async def artifact_response(request: Request, snapshot: TreeSnapshot, name: str, func, media_type: str, etag: str) -> Response:
+    """Serve a memoised document, gzip-compressed once per version for clients that accept it
+
+    Responses that already carry Content-Encoding pass through GZipMiddleware untouched,
+    and it adds Vary to the uncompressed ones.
+    """
+    content = await memoised_artifact(snapshot, name, func)
+    if isinstance(content, str):
+        content = content.encode()
+    headers = etag_headers(etag)
+
+    if len(content) >= RESPONSE_COMPRESSION_MIN_BYTES and "gzip" in request.headers.get("accept-encoding", ""):
+        compressed = snapshot_cache.get((snapshot.key, f"{name}.gz"))
+        if compressed is None:
+            # zlib releases the GIL while compressing
+            compressed = await asyncio.to_thread(gzip.compress, content, RESPONSE_COMPRESSION_LEVEL)
+            snapshot_cache.put((snapshot.key, f"{name}.gz"), compressed)
+        content = compressed
+        headers.update({"Content-Encoding": "gzip", "Vary": "Accept-Encoding"})
+
+    return Response(content=content, media_type=media_type, headers=headers)
+
+async def poll_tree_store():
+    """Keep this worker's tree and change feed current while it is idle"""
+    while True:
+        await asyncio.sleep(TREE_STORE_POLL_INTERVAL)
+        try:
+            await sync_tree_state()
+        except Exception as e:
+            logger.error(f"Error syncing shared tree store: {e}")
+
+# Change feed state: events carry the version of the commit that produced them and
+# are kept in a bounded log so reconnecting clients can resume where they left off
+change_log = deque(maxlen=CHANGE_FEED_BUFFER_SIZE)
+change_log_floor = 0  # Highest version with events already evicted from the log
+change_subscribers: List[asyncio.Queue] = []
+
+def make_tree_event(version: int, event_type: str, node_id: Optional[str] = None, **data) -> Dict[str, Any]:
+    """Build a change feed event for a tree mutation"""
+    return {
+        "version": version,
+        "type": event_type,
+        "node_id": node_id,
+        "timestamp": datetime.now().isoformat(),
+        **data
+    }
+
+def publish_tree_event(event: Dict[str, Any]):
+    """Record a change event and push it to every change feed subscriber"""
+    global change_log_floor
+
+    if len(change_log) == change_log.maxlen:
+        change_log_floor = max(change_log_floor, change_log[0]['version'])
+    change_log.append(event)
+
+    for queue in list(change_subscribers):
+        try:
+            queue.put_nowait(event)
+        except asyncio.QueueFull:
+            # Subscriber fell too far behind; it will be told to resync
+            change_subscribers.remove(queue)
+
+async def commit_tree_snapshot(snapshot: TreeSnapshot, changes: List[tuple]):
+    """Make a snapshot the current tree and publish its change events
+
+    Must be called inside tree_write_lock().
+    """
+    events = [
+        make_tree_event(snapshot.version, event_type, node_id, index=index, **data)
+        for index, (event_type, node_id, data) in enumerate(changes)
+    ]
+    previous_version = tree_history.latest_version
+    await tree_history.commit(snapshot, events)
+    update_duplicate_index(previous_version, snapshot, events)
+    for event in events:
+        publish_tree_event(event)
+
+def format_sse_event(event: Dict[str, Any]) -> str:
+    """Format a change event as a Server-Sent Events message
+
+    Commit events are identified by "<epoch>-<version>-<index>", their position
+    within the commit; resync events by "<epoch>-<version>", covering the whole version.
+    """
+    event_id = f"{tree_history.epoch}-{event['version']}"
+    if 'index' in event:
+        event_id += f"-{event['index']}"
+    return f"id: {event_id}\nevent: {event['type']}\ndata: {json.dumps(event)}\n\n"
+
+def parse_event_id(event_id: str) -> tuple:
+    """Split a change feed event id into (epoch, version, index), with Nones for missing parts"""
+    epoch, _, rest = event_id.partition("-")
+    version, _, index = rest.partition("-")
+    if not version.isdigit() or (index and not index.isdigit()):
+        return None, None, None
+    return epoch, int(version), int(index) if index else None
+
+def validate_product_tree(tree: Any) -> Optional[str]:
+    """Describe the first problem with an imported tree's shape, or None if it can be imported"""
+    if not isinstance(tree, dict):
+        return "Product tree must be an object with nodes and edges"
+
+    nodes = tree.get('nodes') or []
+    edges = tree.get('edges') or []
+    if not isinstance(nodes, list) or not isinstance(edges, list):
+        return "Product tree nodes and edges must be lists"
+
+    def is_id(value):
+        return isinstance(value, (str, int)) and not isinstance(value, bool)
+
+    seen = set()
+    for index, node in enumerate(nodes):
+        if not isinstance(node, dict) or not is_id(node.get('id')):
+            return f"Node {index} must be an object with a string or integer id"
+        # Ids are stored as strings, so 1 and "1" are the same node
+        node_id = str(node['id'])
+        if node_id in seen:
+            return f"Duplicate node id {node_id}"
+        seen.add(node_id)
+    for index, edge in enumerate(edges):
+        if not isinstance(edge, dict) or not is_id(edge.get('from')) or not is_id(edge.get('to')):
+            return f"Edge {index} must be an object with string or integer from and to ids"
+    return None
+
+def normalise_tree_ids(tree: Dict[str, Any]) -> Dict[str, Any]:
+    """Convert integer node and edge endpoint ids to strings, as node paths and batches use"""
+    nodes = tree.get('nodes') or []
+    edges = tree.get('edges') or []
+    if all(isinstance(node['id'], str) for node in nodes) and all(
+        isinstance(edge['from'], str) and isinstance(edge['to'], str) for edge in edges
+    ):
+        return tree
+
+    return {
+        **tree,
+        "nodes": [node if isinstance(node['id'], str) else {**node, "id": str(node['id'])} for node in nodes],
+        "edges": [{**edge, "from": str(edge['from']), "to": str(edge['to'])} for edge in edges]
+    }
+
+def build_imported_snapshot(tree: Dict[str, Any]) -> TreeSnapshot:
+    """Build the snapshot for an imported tree; the version is assigned at commit"""
+    with TREE_REBUILD_LATENCY.labels(operation="import").time(), gc_paused():
+        return TreeSnapshot.from_tree(normalise_tree_ids(tree), 0, "Imported tree")
+
+@app.post("/product-tree/import")
+async def import_product_tree(request: Request):
+    """Import a product tree
+
+    Accepts JSON or MessagePack bodies, optionally gzip or zstd compressed.
+    """
+    tree_data = await read_json_body(request)
+    error = validate_product_tree(tree_data)
+    if error:
+        raise HTTPException(status_code=400, detail=error)
+
+    # Build the persistent maps before taking the write lock; only the commit is serialised
+    node_count = len(tree_data.get('nodes') or [])
+    with profile_phase("tree_build"):
+        imported = await run_tree_work(build_imported_snapshot, tree_data, node_count=node_count)
+
+    async with tree_write_lock():
+        snapshot = imported.with_version(tree_history.next_version(), "Imported tree")
+        await commit_tree_snapshot(snapshot, [("tree_imported", None, {"node_count": len(snapshot.nodes)})])
+    return {"success": True, "version": snapshot.version, "message": f"Imported {node_count} nodes"}
+
+@app.get("/product-tree/versions")
+async def list_tree_versions(request: Request):
+    """List the retained versions of the product tree, newest first"""
+    await sync_tree_state()
+    etag = f'W/"{tree_history.epoch}-{tree_history.latest_version}-versions"'
+    cached = not_modified(request, etag)
+    if cached:
+        return cached
+    
+    return FastJSONResponse({
+        "current_version": tree_history.latest_version,
+        "versions": await tree_history.summaries()
+    }, headers=etag_headers(etag))
+
+@app.get("/product-tree/versions/{version}")
+async def get_tree_version(version: int, request: Request):
+    """Read the product tree as it was at a retained version"""
+    snapshot = await resolve_tree_snapshot(version)
+    if not snapshot:
+        raise HTTPException(status_code=404, detail=f"Version {version} is not in the retained history")
+    
+    etag = tree_etag(snapshot, "tree")
+    cached = not_modified(request, etag)
+    if cached:
+        return cached
+    
+    # Skip jsonable_encoder; the tree is already plain JSON data
+    return FastJSONResponse({**snapshot.summary(), "tree": snapshot.as_dict()}, headers=etag_headers(etag))
+
+@app.post("/product-tree/versions/{version}/revert")
+async def revert_tree_version(version: int):
+    """Make a retained version the current tree again, as a new version"""
+    async with tree_write_lock():
+        snapshot = await tree_history.get(version)
+        if not snapshot:
+            raise HTTPException(status_code=404, detail=f"Version {version} is not in the retained history")
+
+        reverted = snapshot.with_version(tree_history.next_version(), f"Reverted to version {version}")
+        await commit_tree_snapshot(reverted, [("tree_reverted", None, {"reverted_to": version, "node_count": len(reverted.nodes)})])
+
+    logger.info(f"Reverted product tree to version {version}")
+    return {"success": True, "version": reverted.version, "reverted_to": version}
+
+@app.get("/product-tree/changes")
+async def stream_tree_changes(request: Request, since: Optional[int] = None):
+    """Stream tree mutation events as Server-Sent Events
+
+    Clients resume with ?since=<version> or the standard Last-Event-ID header, which
+    also resumes part way through a commit's events (see format_sse_event). If the
+    events to resume from have already fallen out of the change log, the requested
+    version is newer than the current tree, or the id comes from another epoch (the
+    service restarted without a shared store), a single resync event is sent and the
+    client should re-fetch the whole tree.
+    """
+    needs_resync = False
+    since_index = None  # events of the `since` version already delivered; None means all of them
+    if since is None:
+        epoch, last_version, since_index = parse_event_id(request.headers.get("last-event-id", ""))
+        if last_version is not None:
+            since = last_version
+            needs_resync = epoch != tree_history.epoch
+
+    await sync_tree_state()
+
+    # Snapshot the backlog and subscribe in the same step so no event is missed or repeated
+    backlog = []
+    if since is not None and not needs_resync:
+        partial = since_index is not None
+        if since > tree_history.latest_version or since < change_log_floor or (partial and since == change_log_floor):
+            needs_resync = True
+        else:
+            position = (since, since_index if partial else float("inf"))
+            backlog = [event for event in change_log if (event['version'], event.get('index', 0)) > position]
+
+    queue = asyncio.Queue(maxsize=CHANGE_FEED_BUFFER_SIZE)
+    change_subscribers.append(queue)
+
+    async def event_stream():
+        try:
+            if needs_resync:
+                yield format_sse_event({"version": tree_history.latest_version, "type": "resync"})
+            for event in backlog:
+                yield format_sse_event(event)
+
+            while True:
+                if queue not in change_subscribers and queue.empty():
+                    yield format_sse_event({"version": tree_history.latest_version, "type": "resync"})
+                    break
+                if await request.is_disconnected():
+                    break
+                try:
+                    event = await asyncio.wait_for(queue.get(), timeout=CHANGE_FEED_KEEPALIVE)
+                except asyncio.TimeoutError:
+                    yield ": keep-alive\n\n"
+                    continue
+                yield format_sse_event(event)
+        finally:
+            if queue in change_subscribers:
+                change_subscribers.remove(queue)
+
+    return StreamingResponse(
+        event_stream(),
+        media_type="text/event-stream",
+        # An explicit encoding keeps GZipMiddleware from buffering events on older Starlette releases
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no", "Content-Encoding": "identity"}
+    )
+
+def build_debug_report(snapshot: TreeSnapshot) -> Dict[str, Any]:
+    """Analyze the structure of a tree snapshot for the debug endpoint"""
+    tree = snapshot.as_dict()
+    nodes = tree.get('nodes', [])
+    edges = tree.get('edges', [])
+    
+    # Build parent-child relationships
+    children = {}
+    parents = {}
+    
+    for edge in edges:
+        from_id = edge.get('from')
+        to_id = edge.get('to')
         
-        nodes = current_product_tree.get('nodes', [])
-        edges = current_product_tree.get('edges', [])
+        if from_id not in children:
+            children[from_id] = []
+        children[from_id].append(to_id)
         
-        # Build parent-child relationships
-        children = {}
-        parents = {}
+        if to_id not in parents:
+            parents[to_id] = []
+        parents[to_id].append(from_id)
+    
+    # Find root nodes
+    root_nodes = [node['id'] for node in nodes if node['id'] not in parents]
+    
+    # Check for duplicates
+    node_titles = {}
+    duplicates = []
+    for node in nodes:
+        title = node.get('title', '')
+        if title in node_titles:
+            duplicates.append({
+                'title': title,
+                'nodes': [node_titles[title], node['id']]
+            })
+        else:
+            node_titles[title] = node['id']
+    
+    # Check for circular references
+    circular_refs = []
+    for node in nodes:
+        node_id = node['id']
+        visited = set()
+        stack = [node_id]
+        while stack:
+            current = stack.pop()
+            if current in visited:
+                circular_refs.append(node_id)
+                break
+            visited.add(current)
+            stack.extend(children.get(current, []))
+    
+    return {
+        "total_nodes": len(nodes),
+        "total_edges": len(edges),
+        "root_nodes": root_nodes,
+        "duplicates": duplicates,
+        "circular_references": circular_refs,
+        "node_titles": list(node_titles.keys()),
+        "hierarchy_summary": {
+            "nodes_with_children": len([n for n in children.values() if n]),
+            "leaf_nodes": len([n for n in nodes if n['id'] not in children or not children[n['id']]])
+        }
+    }
+
+def build_debug_report_json(snapshot: TreeSnapshot) -> bytes:
+    """Debug report serialised once, so repeat reads of a version skip encoding too"""
+    return orjson.dumps(build_debug_report(snapshot))
+
+def build_product_tree_xml(snapshot: TreeSnapshot) -> str:
+    """Generate the XML document for a tree snapshot"""
+    tree = snapshot.as_dict()
+    
+    # Build hierarchy for XML generation
+    node_map = {node['id']: node for node in tree.get('nodes', [])}
+    children = {}
+    parents = {}
+    
+    # Initialize children dict
+    for node_id in node_map.keys():
+        children[node_id] = []
+    
+    # Process edges to build parent-child relationships
+    for edge in tree.get('edges', []):
+        from_id = edge.get('from')
+        to_id = edge.get('to')
         
-        for edge in edges:
-            from_id = edge.get('from')
-            to_id = edge.get('to')
-            
-            if from_id not in children:
-                children[from_id] = []
+        if from_id in node_map and to_id in node_map:
             children[from_id].append(to_id)
-            
             if to_id not in parents:
                 parents[to_id] = []
             parents[to_id].append(from_id)
+    
+    # Find root nodes (nodes with no parents)
+    root_nodes = [node_id for node_id in node_map.keys() if node_id not in parents]
+    
+    def build_xml_node(node_id, depth=0):
+        """Recursively build XML for a node and its children"""
+        node = node_map[node_id]
+        indent = '  ' * depth
+        
+        # Build attributes
+        attrs = []
+        if node.get('status'):
+            attrs.append(f'status="{node["status"]}"')
+        if node.get('priority'):
+            attrs.append(f'priority="{node["priority"]}"')
+        if node.get('team'):
+            attrs.append(f'team="{node["team"]}"')
+        if node.get('owner'):
+            attrs.append(f'owner="{node["owner"]}"')
+        if node.get('effort'):
+            attrs.append(f'effort="{node["effort"]}"')
+        
+        attr_str = ' ' + ' '.join(attrs) if attrs else ''
+        
+        # Get children
+        node_children = children.get(node_id, [])
+        
+        if node_children:
+            # Node with children
+            xml = f'{indent}<{node["type"]}{attr_str}>\n'
+            xml += f'{indent}  <title>{node["title"]}</title>\n'
+            if node.get('description'):
+                xml += f'{indent}  <description>{node["description"]}</description>\n'
+            
+            # Recursively add children
+            for child_id in node_children:
+                xml += build_xml_node(child_id, depth + 1)
+            
+            xml += f'{indent}</{node["type"]}>\n'
+        else:
+            # Leaf node
+            xml = f'{indent}<{node["type"]}{attr_str}>\n'
+            xml += f'{indent}  <title>{node["title"]}</title>\n'
+            if node.get('description'):
+                xml += f'{indent}  <description>{node["description"]}</description>\n'
+            xml += f'{indent}</{node["type"]}>\n'
+        
+        return xml
+    
+    # Build the complete XML tree
+    xml_content = '<?xml version="1.0" encoding="UTF-8"?>\n'
+    xml_content += '<product_tree>\n'
+    
+    for root_node_id in root_nodes:
+        xml_content += build_xml_node(root_node_id, 1)
+    
+    xml_content += '</product_tree>'
+    
+    return xml_content
+
+@app.get("/product-tree/debug")
+async def debug_product_tree(request: Request, version: Optional[int] = None):
+    """Debug endpoint to analyze product tree structure"""
+    try:
+        snapshot = await resolve_tree_snapshot(version)
+        if not snapshot:
+            return {"error": "No product tree loaded" if version is None else f"Version {version} not found"}
         
-        # Find root nodes
-        root_nodes = [node['id'] for node in nodes if node['id'] not in parents]
-        
-        # Check for duplicates
-        node_titles = {}
-        duplicates = []
-        for node in nodes:
-            title = node.get('title', '')
-            if title in node_titles:
-                duplicates.append({
-                    'title': title,
-                    'nodes': [node_titles[title], node['id']]
-                })
-            else:
-                node_titles[title] = node['id']
-        
-        # Check for circular references
-        circular_refs = []
-        for node in nodes:
-            node_id = node['id']
-            visited = set()
-            stack = [node_id]
-            while stack:
-                current = stack.pop()
-                if current in visited:
-                    circular_refs.append(node_id)
-                    break
-                visited.add(current)
-                stack.extend(children.get(current, []))
+        etag = tree_etag(snapshot, "debug")
+        cached = not_modified(request, etag)
+        if cached:
+            return cached
         
-        return {
-            "total_nodes": len(nodes),
-            "total_edges": len(edges),
-            "root_nodes": root_nodes,
-            "duplicates": duplicates,
-            "circular_references": circular_refs,
-            "node_titles": list(node_titles.keys()),
-            "hierarchy_summary": {
-                "nodes_with_children": len([n for n in children.values() if n]),
-                "leaf_nodes": len([n for n in nodes if n['id'] not in children or not children[n['id']]])
-            }
-        }
+        with profile_phase("analysis"):
+            return await artifact_response(request, snapshot, "debug", build_debug_report_json, "application/json", etag)
         
     except Exception as e:
         logger.error(f"Error debugging product tree: {str(e)}")
         return {"error": str(e)}
 
 @app.get("/product-tree/xml")
-async def get_product_tree_xml():
+async def get_product_tree_xml(request: Request, version: Optional[int] = None):
     """Generate XML from the current product tree"""
     try:
-        global current_product_tree
-        if not current_product_tree:
-            return {"error": "No product tree loaded"}
-        
-        # Build hierarchy for XML generation
-        node_map = {node['id']: node for node in current_product_tree.get('nodes', [])}
-        children = {}
-        parents = {}
+        snapshot = await resolve_tree_snapshot(version)
+        if not snapshot:
+            return {"error": "No product tree loaded" if version is None else f"Version {version} not found"}
         
-        # Initialize children dict
-        for node_id in node_map.keys():
-            children[node_id] = []
+        etag = tree_etag(snapshot, "xml")
+        cached = not_modified(request, etag)
+        if cached:
+            return cached
         
-        # Process edges to build parent-child relationships
-        for edge in current_product_tree.get('edges', []):
-            from_id = edge.get('from')
-            to_id = edge.get('to')
-            
-            if from_id in node_map and to_id in node_map:
-                children[from_id].append(to_id)
-                if to_id not in parents:
-                    parents[to_id] = []
-                parents[to_id].append(from_id)
-        
-        # Find root nodes (nodes with no parents)
-        root_nodes = [node_id for node_id in node_map.keys() if node_id not in parents]
-        
-        def build_xml_node(node_id, depth=0):
-            """Recursively build XML for a node and its children"""
-            node = node_map[node_id]
-            indent = '  ' * depth
-            
-            # Build attributes
-            attrs = []
-            if node.get('status'):
-                attrs.append(f'status="{node["status"]}"')
-            if node.get('priority'):
-                attrs.append(f'priority="{node["priority"]}"')
-            if node.get('team'):
-                attrs.append(f'team="{node["team"]}"')
-            if node.get('owner'):
-                attrs.append(f'owner="{node["owner"]}"')
-            if node.get('effort'):
-                attrs.append(f'effort="{node["effort"]}"')
-            
-            attr_str = ' ' + ' '.join(attrs) if attrs else ''
-            
-            # Get children
-            node_children = children.get(node_id, [])
-            
-            if node_children:
-                # Node with children
-                xml = f'{indent}<{node["type"]}{attr_str}>\n'
-                xml += f'{indent}  <title>{node["title"]}</title>\n'
-                if node.get('description'):
-                    xml += f'{indent}  <description>{node["description"]}</description>\n'
-                
-                # Recursively add children
-                for child_id in node_children:
-                    xml += build_xml_node(child_id, depth + 1)
-                
-                xml += f'{indent}</{node["type"]}>\n'
-            else:
-                # Leaf node
-                xml = f'{indent}<{node["type"]}{attr_str}>\n'
-                xml += f'{indent}  <title>{node["title"]}</title>\n'
-                if node.get('description'):
-                    xml += f'{indent}  <description>{node["description"]}</description>\n'
-                xml += f'{indent}</{node["type"]}>\n'
-            
-            return xml
-        
-        # Build the complete XML tree
-        xml_content = '<?xml version="1.0" encoding="UTF-8"?>\n'
-        xml_content += '<product_tree>\n'
-        
-        for root_node_id in root_nodes:
-            xml_content += build_xml_node(root_node_id, 1)
-        
-        xml_content += '</product_tree>'
-        
-        return Response(
-            content=xml_content,
-            media_type="application/xml",
-            headers={"Content-Type": "application/xml; charset=utf-8"}
-        )
+        with profile_phase("serialisation"):
+            return await artifact_response(
+                request, snapshot, "xml", build_product_tree_xml, "application/xml; charset=utf-8", etag
+            )
         
     except Exception as e:
         logger.error(f"Error generating XML: {str(e)}")
         return {"error": str(e)}
 
+# Near-duplicate node detection
+DUPLICATE_STOPWORDS = {"a", "an", "and", "the", "of", "for", "to", "in", "on", "with", "by", "as", "at", "is", "be", "or"}
+
+def shingle_node(node: Dict[str, Any]) -> set:
+    """Word shingles of a node's title and description, ignoring order and case"""
+    text = f"{node.get('title') or ''} {node.get('description') or ''}".lower()
+    return {token for token in re.findall(r"[a-z0-9]+", text) if token not in DUPLICATE_STOPWORDS}
+
+class DuplicateIndex:
+    """MinHash signatures with LSH banding over node titles and descriptions.
+
+    The permutation hashes of recently seen tokens are kept in a small LRU of
+    compact arrays, so a node's signature is an element-wise minimum over its
+    tokens without rehashing common words. Nodes are only compared
+    when they share an LSH band, which keeps clustering close to linear in tree size.
+    """
+
+    MERSENNE_PRIME = (1 << 31) - 1
+
+    def __init__(self, permutations: int, bands: int, version: int = 0):
+        self.permutations = permutations
+        self.bands = bands
+        self.rows = permutations // bands
+        self.version = version
+        self.signatures = {}  # node id -> signature array
+        self.buckets = {}  # (band, band values as bytes) -> set of node ids
+        self.lock = threading.Lock()
+        self.cluster_cache = {}  # threshold -> clusters, cleared on every change
+        self.token_cache = OrderedDict()  # token -> array of per-permutation hashes
+
+        rng = random.Random(permutations)
+        self.coefficients = [
+            (rng.randrange(1, self.MERSENNE_PRIME), rng.randrange(0, self.MERSENNE_PRIME))
+            for _ in range(permutations)
+        ]
+
+    def __getstate__(self):
+        state = self.__dict__.copy()
+        del state['lock']
+        state['token_cache'] = OrderedDict()
+        return state
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        self.lock = threading.Lock()
+
+    def _token_hashes(self, token: str) -> array:
+        hashes = self.token_cache.get(token)
+        if hashes is not None:
+            self.token_cache.move_to_end(token)
+            return hashes
+
+        value = zlib.crc32(token.encode())
+        # Values stay below 2**31, so 4-byte unsigned ints hold them exactly
+        hashes = array('I', [(a * value + b) % self.MERSENNE_PRIME for a, b in self.coefficients])
+        self.token_cache[token] = hashes
+        if len(self.token_cache) > DUPLICATE_TOKEN_CACHE_SIZE:
+            self.token_cache.popitem(last=False)
+        return hashes
+
+    def _band_keys(self, signature: array) -> List[tuple]:
+        return [
+            (band, signature[band * self.rows:(band + 1) * self.rows].tobytes())
+            for band in range(self.bands)
+        ]
+
+    def add(self, node_id: str, node: Dict[str, Any]):
+        self.cluster_cache.clear()
+        tokens = shingle_node(node)
+        if not tokens:
+            return
+        signature = array('I', map(min, zip(*(self._token_hashes(token) for token in tokens))))
+        self.signatures[node_id] = signature
+        for key in self._band_keys(signature):
+            self.buckets.setdefault(key, set()).add(node_id)
+
+    def remove(self, node_id: str):
+        self.cluster_cache.clear()
+        signature = self.signatures.pop(node_id, None)
+        if signature is None:
+            return
+        for key in self._band_keys(signature):
+            bucket = self.buckets.get(key)
+            if bucket is not None:
+                bucket.discard(node_id)
+                if not bucket:
+                    del self.buckets[key]
+
+    def similarity(self, first_id: str, second_id: str) -> float:
+        """Estimated Jaccard similarity of two indexed nodes"""
+        first, second = self.signatures[first_id], self.signatures[second_id]
+        return sum(map(operator.eq, first, second)) / self.permutations
+
+    def find_clusters(self, threshold: float) -> List[List[tuple]]:
+        """Greedy star clustering of nodes whose estimated similarity reaches the threshold
+
+        Each unassigned node, in id order, becomes a cluster's representative and takes
+        every unassigned candidate from its LSH buckets that reaches the threshold against
+        it, so members are never chained together through each other. Returns clusters
+        as lists of (node_id, similarity to the representative), representative first,
+        largest clusters first.
+        """
+        with self.lock:
+            if threshold in self.cluster_cache:
+                return self.cluster_cache[threshold]
+
+            # Working copies of the candidate buckets; assigned nodes are removed as we go
+            open_buckets = {key: set(bucket) for key, bucket in self.buckets.items() if len(bucket) > 1}
+            memberships = {}  # node id -> keys of its open buckets
+            for key, bucket in open_buckets.items():
+                for node_id in bucket:
+                    memberships.setdefault(node_id, []).append(key)
+
+            clusters = []
+            assigned = set()
+            for leader_id in sorted(memberships):
+                if leader_id in assigned:
+                    continue
+
+                members = []
+                compared = {leader_id}
+                for key in memberships[leader_id]:
+                    for node_id in open_buckets[key]:
+                        if node_id in compared:
+                            continue
+                        compared.add(node_id)
+                        similarity = self.similarity(leader_id, node_id)
+                        if similarity >= threshold:
+                            members.append((node_id, similarity))
+
+                members.sort()
+                members.insert(0, (leader_id, 1.0))
+                if len(members) > 1:
+                    clusters.append(members)
+                for node_id, _ in members:
+                    assigned.add(node_id)
+                    for key in memberships[node_id]:
+                        open_buckets[key].discard(node_id)
+
+            clusters.sort(key=lambda cluster: (-len(cluster), cluster[0][0]))
+            self.cluster_cache[threshold] = clusters
+        return clusters
+
+def build_duplicate_index(snapshot: TreeSnapshot) -> DuplicateIndex:
+    """Index every node of a snapshot"""
+    index = DuplicateIndex(DUPLICATE_MINHASH_PERMUTATIONS, DUPLICATE_LSH_BANDS, snapshot.version)
+    for node_id, node in snapshot.nodes.items():
+        index.add(node_id, node)
+    return index
+
+duplicate_index: Optional[DuplicateIndex] = None  # built on first use, then kept current by commits
+
+def update_duplicate_index(previous_version: int, snapshot: TreeSnapshot, events: List[Dict[str, Any]]):
+    """Apply committed node changes to the duplicate index, or drop it for a lazy rebuild"""
+    global duplicate_index
+    index = duplicate_index
+    if index is None:
+        return
+
+    rebuild = (
+        index.version != previous_version
+        or any(event['type'] in ("tree_imported", "tree_reverted", "resync") for event in events)
+    )
+    if rebuild or not index.lock.acquire(blocking=False):
+        # Never block the event loop on a running cluster search
+        duplicate_index = None
+        return
+
+    try:
+        changed = {
+            event['node_id'] for event in events
+            if event['type'] in ("node_created", "node_deleted")
+            or (event['type'] == "node_updated" and {'title', 'description'} & set(event.get('updates', {})))
+        }
+        for node_id in changed:
+            index.remove(node_id)
+            node = snapshot.nodes.get(node_id)
+            if node is not None:
+                index.add(node_id, node)
+        index.version = snapshot.version
+    finally:
+        index.lock.release()
+
+@app.get("/product-tree/duplicates")
+async def find_duplicate_nodes(request: Request, threshold: float = DUPLICATE_SIMILARITY_THRESHOLD, limit: int = 100):
+    """Find clusters of near-duplicate nodes by title and description"""
+    global duplicate_index
+    # One agreeing signature position is the smallest similarity MinHash can estimate
+    threshold = min(max(threshold, 1 / DUPLICATE_MINHASH_PERMUTATIONS), 1.0)
+    limit = max(limit, 1)
+    try:
+        snapshot = await resolve_tree_snapshot()
+        if not snapshot:
+            return {"error": "No product tree loaded"}
+
+        etag = tree_etag(snapshot, f"duplicates-{threshold}-{limit}")
+        cached = not_modified(request, etag)
+        if cached:
+            return cached
+
+        index = duplicate_index
+        if index is None or index.version != snapshot.version:
+            with profile_phase("analysis"):
+                index = await run_tree_work(build_duplicate_index, snapshot, node_count=len(snapshot.nodes))
+            if index.version == tree_history.latest_version:
+                duplicate_index = index
+
+        with profile_phase("analysis"):
+            clusters = await run_tree_work(index.find_clusters, threshold, node_count=len(index.signatures))
+
+        return FastJSONResponse({
+            "version": index.version,
+            "threshold": threshold,
+            "total_clusters": len(clusters),
+            "clusters": [
+                {
+                    "size": len(cluster),
+                    "nodes": [
+                        {
+                            "id": node_id,
+                            "title": snapshot.nodes[node_id].get('title'),
+                            "type": snapshot.nodes[node_id].get('type'),
+                            "team": snapshot.nodes[node_id].get('team'),
+                            "similarity": round(similarity, 3)
+                        }
+                        for node_id, similarity in cluster
+                        if node_id in snapshot.nodes
+                    ]
+                }
+                for cluster in clusters[:limit]
+            ]
+        }, headers=etag_headers(etag))
+
+    except Exception as e:
+        logger.error(f"Error finding duplicate nodes: {str(e)}")
+        return {"error": str(e)}
+
 # Product Tree CRUD Operations
 @app.post("/product-tree/nodes")
 async def create_node(request: NodeRequest):
     """Create a new node in the product tree"""
-    try:
-        # This would typically save to a database
-        # For now, we'll return the created node structure
-        node = {
-            "id": request.node_id,
-            "title": request.title,
-            "type": request.type,
-            "description": request.description,
-            "status": request.status or "Not Started",
-            "priority": request.priority or "Medium",
-            "team": request.team,
-            "owner": request.owner,
-            "effort": request.effort,
-            "parent_id": request.parent_id,
-            "created_at": datetime.now().isoformat()
-        }
-        
-        return {"success": True, "node": node}
-        
-    except Exception as e:
-        logger.error(f"Error creating node: {str(e)}")
-        raise HTTPException(status_code=500, detail=str(e))
+    fields = {
+        "title": request.title,
+        "type": request.type,
+        "description": request.description,
+        "status": request.status or "Not Started",
+        "priority": request.priority or "Medium",
+        "team": request.team,
+        "owner": request.owner,
+        "effort": request.effort
+    }
+    snapshot = await commit_node_operation(
+        BatchOperation(op="create", node_id=request.node_id, node=fields, parent_id=request.parent_id)
+    )
+    node = snapshot.nodes[request.node_id]
+    return {"success": True, "version": snapshot.version, "node": {**node, "parent_id": request.parent_id}}
 
 @app.put("/product-tree/nodes/{node_id}")
 async def update_node(node_id: str, request: UpdateNodeRequest):
     """Update an existing node"""
-    try:
-        # This would typically update in a database
-        # For now, we'll return the updated node structure
-        updated_node = {
-            "id": node_id,
-            "updated_at": datetime.now().isoformat(),
-            **request.updates
-        }
-        
-        return {"success": True, "node": updated_node}
-        
-    except Exception as e:
-        logger.error(f"Error updating node: {str(e)}")
-        raise HTTPException(status_code=500, detail=str(e))
+    snapshot = await commit_node_operation(BatchOperation(op="update", node_id=node_id, updates=request.updates))
+    return {"success": True, "version": snapshot.version, "node": snapshot.nodes[node_id]}
 
 @app.delete("/product-tree/nodes/{node_id}")
 async def delete_node(node_id: str):
-    """Delete a node from the product tree"""
-    try:
-        # This would typically delete from a database
-        return {"success": True, "message": f"Node {node_id} deleted"}
-        
-    except Exception as e:
-        logger.error(f"Error deleting node: {str(e)}")
-        raise HTTPException(status_code=500, detail=str(e))
+    """Delete a node from the product tree; its children become roots"""
+    snapshot = await commit_node_operation(BatchOperation(op="delete", node_id=node_id))
+    return {"success": True, "version": snapshot.version, "message": f"Node {node_id} deleted"}
 
 @app.get("/product-tree/nodes/{node_id}")
-async def get_node(node_id: str):
+async def get_node(node_id: str, request: Request):
     """Get details of a specific node"""
-    try:
-        # This would typically fetch from a database
-        # For now, return a sample node
-        node = {
-            "id": node_id,
-            "title": "Sample Node",
-            "type": "Work Item",
-            "description": "This is a sample node",
-            "status": "In Progress",
-            "priority": "High",
-            "team": "Development Team",
-            "owner": "John Doe",
-            "effort": "5 days",
-            "parent_id": None,
-            "created_at": datetime.now().isoformat()
+    snapshot = await resolve_tree_snapshot()
+    node = snapshot.nodes.get(node_id) if snapshot else None
+    if node is None:
+        raise HTTPException(status_code=404, detail=f"Node {node_id} not found")
+    
+    etag = tree_etag(snapshot, f"node-{node_id}")
+    cached = not_modified(request, etag)
+    if cached:
+        return cached
+    
+    parent_ids = [edge.get('from') for _, edge in snapshot.incoming.get(node_id, ())]
+    return FastJSONResponse(
+        {"success": True, "node": {**node, "parent_id": parent_ids[0] if parent_ids else None}},
+        headers=etag_headers(etag)
+    )
+
+def apply_batch_operations(snapshot: TreeSnapshot, operations: List[BatchOperation], version: int):
+    """Apply an ordered list of operations on top of a tree snapshot.
+
+    Returns (new_snapshot, results, changes, success), where changes are the change
+    feed events for the applied operations. Each operation only touches the affected
+    entries of the persistent maps, and the input snapshot is never modified, so a
+    failed batch is simply discarded. Operations run in order and may refer to nodes
+    created earlier in the same batch; the first failure stops the batch. The new
+    snapshot records the touched entries as a delta for the shared tree store.
+    """
+    nodes = snapshot.nodes
+    incoming = snapshot.incoming
+    children = snapshot.children
+    positions = snapshot.positions
+    next_position = snapshot.next_position
+
+    deleted = set()
+    touched_nodes = set()
+    touched_incoming = set()
+    touched_children = set()
+    results = []
+    changes = []
+    now = datetime.now().isoformat()
+
+    def parents_of(node_id):
+        return [edge.get('from') for _, edge in incoming.get(node_id, ())]
+
+    def is_ancestor(candidate_id, node_id):
+        """Check whether candidate_id sits above node_id in the hierarchy"""
+        visited = set()
+        stack = parents_of(node_id)
+        while stack:
+            current = stack.pop()
+            if current == candidate_id:
+                return True
+            if current in visited:
+                continue
+            visited.add(current)
+            stack.extend(parents_of(current))
+        return False
+
+    def detach(node_id):
+        """Remove every edge pointing at node_id"""
+        nonlocal incoming, children
+        for parent_id in parents_of(node_id):
+            siblings = tuple(child_id for child_id in children.get(parent_id, ()) if child_id != node_id)
+            children = children.set(parent_id, siblings) if siblings else children.discard(parent_id)
+            touched_children.add(parent_id)
+        incoming = incoming.discard(node_id)
+        touched_incoming.add(node_id)
+
+    def attach(node_id, parent_id):
+        nonlocal incoming, children, next_position
+        edge = {
+            "id": f"edge_{parent_id}_{node_id}",
+            "from": parent_id,
+            "to": node_id,
+            "type": "contains"
         }
-        
-        return {"success": True, "node": node}
-        
+        incoming = incoming.set(node_id, ((next_position, edge),))
+        children = children.set(parent_id, children.get(parent_id, ()) + (node_id,))
+        touched_incoming.add(node_id)
+        touched_children.add(parent_id)
+        next_position += 1
+
+    for index, operation in enumerate(operations):
+        node_id = operation.node_id
+        error = None
+
+        if operation.op == "create":
+            fields = dict(operation.node or {})
+            parent_id = operation.parent_id or fields.get('parent_id')
+            if node_id in nodes:
+                error = f"Node {node_id} already exists"
+            elif node_id in deleted:
+                error = f"Node {node_id} was deleted earlier in this batch"
+            elif not fields.get('title') or not fields.get('type'):
+                error = "New nodes require a title and type"
+            elif parent_id and parent_id not in nodes:
+                error = f"Parent node {parent_id} not found"
+            else:
+                fields.setdefault('status', "Not Started")
+                fields.setdefault('priority', "Medium")
+                nodes = nodes.set(node_id, {**fields, "id": node_id, "created_at": now})
+                positions = positions.set(node_id, next_position)
+                next_position += 1
+                if parent_id:
+                    attach(node_id, parent_id)
+                changes.append(("node_created", node_id, {"node": nodes[node_id], "parent_id": parent_id}))
+
+        elif operation.op == "update":
+            updates = operation.updates or {}
+            if node_id not in nodes:
+                error = f"Node {node_id} not found"
+            elif 'id' in updates:
+                error = "Node ids cannot be changed"
+            elif 'parent_id' in updates:
+                error = "Use a move operation to change a node's parent"
+            else:
+                nodes = nodes.set(node_id, {**nodes[node_id], **updates, "updated_at": now})
+                changes.append(("node_updated", node_id, {"updates": updates}))
+
+        elif operation.op == "delete":
+            if node_id not in nodes:
+                error = f"Node {node_id} not found"
+            else:
+                # Children stay in the tree as roots, matching the UI's delete
+                detach(node_id)
+                for child_id in children.get(node_id, ()):
+                    remaining = tuple(entry for entry in incoming.get(child_id, ()) if entry[1].get('from') != node_id)
+                    incoming = incoming.set(child_id, remaining) if remaining else incoming.discard(child_id)
+                    touched_incoming.add(child_id)
+                children = children.discard(node_id)
+                touched_children.add(node_id)
+                nodes = nodes.discard(node_id)
+                positions = positions.discard(node_id)
+                deleted.add(node_id)
+                changes.append(("node_deleted", node_id, {}))
+
+        elif operation.op == "move":
+            parent_id = operation.parent_id
+            if node_id not in nodes:
+                error = f"Node {node_id} not found"
+            elif parent_id and parent_id not in nodes:
+                error = f"Parent node {parent_id} not found"
+            elif parent_id == node_id or (parent_id and is_ancestor(node_id, parent_id)):
+                error = f"Moving {node_id} under {parent_id} would create a cycle"
+            else:
+                detach(node_id)
+                if parent_id:
+                    attach(node_id, parent_id)
+                nodes = nodes.set(node_id, {**nodes[node_id], "updated_at": now})
+                changes.append(("node_moved", node_id, {"parent_id": parent_id}))
+
+        if error:
+            results.append({"index": index, "op": operation.op, "node_id": node_id, "success": False, "error": error})
+            for skipped_index, skipped in enumerate(operations[index + 1:], start=index + 1):
+                results.append({"index": skipped_index, "op": skipped.op, "node_id": skipped.node_id, "success": False, "error": "Skipped"})
+            return snapshot, results, [], False
+
+        touched_nodes.add(node_id)
+        results.append({"index": index, "op": operation.op, "node_id": node_id, "success": True})
+
+    new_snapshot = TreeSnapshot(version, nodes, incoming, children, positions, next_position,
+                                snapshot.metadata, f"Batch of {len(operations)} operations")
+    new_snapshot.base_version = snapshot.version
+    new_snapshot.delta = {
+        "nodes": [[node_id, nodes.get(node_id)] for node_id in touched_nodes],
+        "positions": [[node_id, positions.get(node_id)] for node_id in touched_nodes],
+        "incoming": [[node_id, incoming.get(node_id)] for node_id in touched_incoming],
+        "children": [[node_id, children.get(node_id)] for node_id in touched_children],
+        "next_position": next_position
+    }
+    return new_snapshot, results, changes, True
+
+async def commit_node_operation(operation: BatchOperation) -> TreeSnapshot:
+    """Commit a single-node operation as a new version, raising HTTPException if it fails"""
+    async with tree_write_lock():
+        snapshot = tree_history.current() or TreeSnapshot.from_tree({}, 0, "Empty tree")
+
+        with TREE_REBUILD_LATENCY.labels(operation="batch").time(), profile_phase("tree_build"):
+            new_snapshot, results, changes, success = apply_batch_operations(
+                snapshot, [operation], tree_history.next_version()
+            )
+        if not success:
+            error = results[0]['error']
+            status_code = 404 if error == f"Node {operation.node_id} not found" else 400
+            raise HTTPException(status_code=status_code, detail=error)
+
+        await commit_tree_snapshot(new_snapshot, changes)
+    return new_snapshot
+
+@app.post("/product-tree/batch")
+async def batch_update_product_tree(request: BatchRequest):
+    """Apply a batch of create/update/delete/move operations atomically"""
+    if not request.operations:
+        raise HTTPException(status_code=400, detail="A batch needs at least one operation")
+
+    try:
+        async with tree_write_lock():
+            snapshot = tree_history.current() or TreeSnapshot.from_tree({}, 0, "Empty tree")
+
+            with TREE_REBUILD_LATENCY.labels(operation="batch").time(), profile_phase("tree_build"):
+                new_snapshot, results, changes, success = apply_batch_operations(
+                    snapshot, request.operations, tree_history.next_version()
+                )
+            if not success:
+                return JSONResponse(status_code=400, content={"success": False, "results": results})
+
+            await commit_tree_snapshot(new_snapshot, changes)
+
+        logger.info(f"Applied batch of {len(results)} operations")
+        return {"success": True, "version": new_snapshot.version, "results": results}
+
     except Exception as e:
-        logger.error(f"Error getting node: {str(e)}")
+        logger.error(f"Error applying batch: {str(e)}")
         raise HTTPException(status_code=500, detail=str(e))
 
 if __name__ == "__main__":
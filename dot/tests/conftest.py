@@ -0,0 +1,8 @@
+import os
+import sys
+
+# Keep the service self-contained under test: no model calls, no shared store on disk
+os.environ["AI_INTEGRATION_ENABLED"] = "false"
+os.environ.pop("TREE_STORE_PATH", None)
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
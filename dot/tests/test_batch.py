@@ -0,0 +1,116 @@
+import pytest
+from fastapi.testclient import TestClient
+
+from main import app
+
+client = TestClient(app)
+
+TREE = {
+    "nodes": [
+        {"id": "root", "title": "Root", "type": "outcome"},
+        {"id": "a", "title": "A", "type": "opportunity"},
+        {"id": "a1", "title": "A1", "type": "solution"},
+        {"id": "b", "title": "B", "type": "opportunity"},
+    ],
+    "edges": [
+        {"from": "root", "to": "a"},
+        {"from": "a", "to": "a1"},
+        {"from": "root", "to": "b"},
+    ],
+}
+
+
+def batch(*operations):
+    return client.post("/product-tree/batch", json={"operations": list(operations)})
+
+
+def current_version():
+    return client.get("/product-tree/versions").json()["current_version"]
+
+
+def parent_of(node_id):
+    return client.get(f"/product-tree/nodes/{node_id}").json()["node"]["parent_id"]
+
+
+@pytest.fixture(autouse=True)
+def imported_tree():
+    response = client.post("/product-tree/import", json=TREE)
+    assert response.status_code == 200
+    return response.json()["version"]
+
+
+def test_batch_applies_operations_in_order(imported_tree):
+    response = batch(
+        {"op": "create", "node_id": "c", "node": {"title": "C", "type": "job"}, "parent_id": "b"},
+        {"op": "update", "node_id": "c", "updates": {"title": "C2"}},
+        {"op": "move", "node_id": "a1", "parent_id": "c"},
+    )
+    assert response.status_code == 200
+    assert response.json()["version"] == imported_tree + 1
+    assert parent_of("c") == "b"
+    assert parent_of("a1") == "c"
+    assert client.get("/product-tree/nodes/c").json()["node"]["title"] == "C2"
+
+
+def test_failed_batch_leaves_tree_unchanged(imported_tree):
+    response = batch(
+        {"op": "create", "node_id": "c", "node": {"title": "C", "type": "job"}, "parent_id": "b"},
+        {"op": "move", "node_id": "a1", "parent_id": "b"},
+        {"op": "delete", "node_id": "missing"},
+        {"op": "delete", "node_id": "a"},
+    )
+    assert response.status_code == 400
+    results = response.json()["results"]
+    assert [result["success"] for result in results] == [True, True, False, False]
+    assert results[3]["error"] == "Skipped"
+
+    assert current_version() == imported_tree
+    assert client.get("/product-tree/nodes/c").status_code == 404
+    assert parent_of("a1") == "a"
+
+
+def test_move_rejects_cycles(imported_tree):
+    response = batch({"op": "move", "node_id": "root", "parent_id": "a1"})
+    assert response.status_code == 400
+    assert "cycle" in response.json()["results"][0]["error"]
+
+    response = batch({"op": "move", "node_id": "a", "parent_id": "a"})
+    assert response.status_code == 400
+    assert current_version() == imported_tree
+
+
+def test_move_detects_cycles_created_earlier_in_batch():
+    response = batch(
+        {"op": "move", "node_id": "b", "parent_id": "a1"},
+        {"op": "move", "node_id": "a", "parent_id": "b"},
+    )
+    assert response.status_code == 400
+    assert "cycle" in response.json()["results"][1]["error"]
+    assert parent_of("b") == "root"
+
+
+def test_delete_turns_children_into_roots():
+    response = batch({"op": "delete", "node_id": "a"})
+    assert response.status_code == 200
+    assert client.get("/product-tree/nodes/a").status_code == 404
+    assert parent_of("a1") is None
+    assert parent_of("b") == "root"
+
+
+def test_update_cannot_change_parent(imported_tree):
+    response = batch({"op": "update", "node_id": "a1", "updates": {"parent_id": "b"}})
+    assert response.status_code == 400
+    assert "move" in response.json()["results"][0]["error"]
+    assert parent_of("a1") == "a"
+    assert current_version() == imported_tree
+
+
+def test_empty_batch_is_rejected(imported_tree):
+    response = client.post("/product-tree/batch", json={"operations": []})
+    assert response.status_code == 400
+    assert current_version() == imported_tree
+
+
+def test_unknown_operation_is_rejected():
+    response = batch({"op": "rename", "node_id": "a"})
+    assert response.status_code == 422
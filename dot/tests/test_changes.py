@@ -0,0 +1,67 @@
+import asyncio
+import json
+
+import pytest
+from fastapi.testclient import TestClient
+from starlette.requests import Request
+
+import main
+from main import app
+
+client = TestClient(app)
+
+
+def read_events(count, since=None, last_event_id=None):
+    """Read the first `count` events the change feed sends to a new client"""
+    async def collect():
+        headers = [(b"last-event-id", last_event_id.encode())] if last_event_id else []
+        request = Request({"type": "http", "method": "GET", "path": "/product-tree/changes", "headers": headers, "query_string": b""})
+        response = await main.stream_tree_changes(request, since)
+        events = []
+        try:
+            async for chunk in response.body_iterator:
+                fields = dict(line.split(": ", 1) for line in chunk.strip().splitlines())
+                events.append({"id": fields["id"], **json.loads(fields["data"])})
+                if len(events) == count:
+                    break
+        finally:
+            await response.body_iterator.aclose()
+        return events
+
+    return asyncio.run(asyncio.wait_for(collect(), timeout=5))
+
+
+@pytest.fixture(autouse=True)
+def three_op_batch():
+    client.post("/product-tree/import", json={"nodes": [{"id": "root", "title": "Root", "type": "goal"}], "edges": []})
+    response = client.post("/product-tree/batch", json={"operations": [
+        {"op": "create", "node_id": "a", "node": {"title": "A", "type": "job"}, "parent_id": "root"},
+        {"op": "create", "node_id": "b", "node": {"title": "B", "type": "job"}, "parent_id": "root"},
+        {"op": "update", "node_id": "root", "updates": {"title": "Renamed"}},
+    ]})
+    assert response.status_code == 200
+    return response.json()["version"]
+
+
+def test_since_replays_every_event_of_later_versions(three_op_batch):
+    events = read_events(3, since=three_op_batch - 1)
+    assert [event["type"] for event in events] == ["node_created", "node_created", "node_updated"]
+    assert [event["id"] for event in events] == [f"{main.tree_history.epoch}-{three_op_batch}-{index}" for index in range(3)]
+
+
+def test_last_event_id_resumes_within_a_commit(three_op_batch):
+    first = read_events(1, since=three_op_batch - 1)[0]
+    events = read_events(2, last_event_id=first["id"])
+    assert [(event["type"], event["node_id"]) for event in events] == [("node_created", "b"), ("node_updated", "root")]
+
+
+def test_client_ahead_of_the_server_is_told_to_resync(three_op_batch):
+    events = read_events(1, since=three_op_batch + 10)
+    assert events[0]["type"] == "resync"
+    assert events[0]["version"] == three_op_batch
+
+
+def test_event_id_from_another_epoch_triggers_resync(three_op_batch):
+    events = read_events(1, last_event_id=f"other-{three_op_batch}-0")
+    assert events[0]["type"] == "resync"
+    assert events[0]["id"] == f"{main.tree_history.epoch}-{three_op_batch}"
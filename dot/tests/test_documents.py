@@ -0,0 +1,67 @@
+import pytest
+from fastapi.testclient import TestClient
+
+from main import app
+
+client = TestClient(app)
+
+# Enough nodes that the documents pass RESPONSE_COMPRESSION_MIN_BYTES
+TREE = {
+    "nodes": [{"id": "root", "title": "Root", "type": "goal"}]
+    + [{"id": f"n{index}", "title": f"Node {index}", "type": "job", "description": "x" * 40} for index in range(200)],
+    "edges": [{"from": "root", "to": f"n{index}"} for index in range(200)],
+}
+
+
+@pytest.fixture(autouse=True)
+def imported_tree():
+    response = client.post("/product-tree/import", json=TREE)
+    assert response.status_code == 200
+    return response.json()["version"]
+
+
+@pytest.mark.parametrize("path", ["/product-tree/debug", "/product-tree/xml", "/product-tree/nodes/n1", "/product-tree/versions"])
+def test_matching_etag_returns_304(path):
+    response = client.get(path)
+    assert response.status_code == 200
+    etag = response.headers["etag"]
+
+    cached = client.get(path, headers={"If-None-Match": etag})
+    assert cached.status_code == 304
+    assert cached.content == b""
+    assert cached.headers["etag"] == etag
+
+
+@pytest.mark.parametrize("path", ["/product-tree/debug", "/product-tree/xml"])
+def test_etag_changes_with_each_version(path):
+    etag = client.get(path).headers["etag"]
+    client.put("/product-tree/nodes/n1", json={"updates": {"title": "Renamed node"}})
+
+    response = client.get(path, headers={"If-None-Match": etag})
+    assert response.status_code == 200
+    assert response.headers["etag"] != etag
+    assert "Renamed node" in response.text
+
+
+def test_pinned_version_keeps_its_etag(imported_tree):
+    path = f"/product-tree/xml?version={imported_tree}"
+    etag = client.get(path).headers["etag"]
+    client.put("/product-tree/nodes/n1", json={"updates": {"title": "Renamed node"}})
+    assert client.get(path, headers={"If-None-Match": etag}).status_code == 304
+
+
+def test_documents_are_served_compressed_or_plain():
+    compressed = client.get("/product-tree/xml", headers={"Accept-Encoding": "gzip"})
+    assert compressed.headers["content-encoding"] == "gzip"
+    assert "Accept-Encoding" in compressed.headers["vary"]
+
+    plain = client.get("/product-tree/xml", headers={"Accept-Encoding": "identity"})
+    assert "content-encoding" not in plain.headers
+    assert compressed.content == plain.content  # httpx decodes the gzip body
+    assert compressed.headers["etag"] == plain.headers["etag"]
+
+
+def test_repeat_reads_reuse_the_memoised_document():
+    first = client.get("/product-tree/debug", headers={"Accept-Encoding": "identity"})
+    second = client.get("/product-tree/debug", headers={"Accept-Encoding": "identity"})
+    assert first.content == second.content
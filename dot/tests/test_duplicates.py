@@ -0,0 +1,86 @@
+import pytest
+from fastapi.testclient import TestClient
+
+import main
+from main import app
+
+client = TestClient(app)
+
+TREE = {
+    "nodes": [
+        {"id": "root", "title": "Checkout", "type": "goal"},
+        {"id": "login-1", "title": "Login page revamp", "type": "job"},
+        {"id": "login-2", "title": "Revamp login page", "type": "job"},
+        {"id": "login-3", "title": "Revamp the login page", "type": "job", "team": "Web"},
+        {"id": "billing", "title": "Migrate billing service to the new payment provider", "type": "job"},
+        {"id": "search", "title": "Search index sharding", "type": "job"},
+    ],
+    "edges": [],
+}
+
+
+@pytest.fixture(autouse=True)
+def imported_tree():
+    response = client.post("/product-tree/import", json=TREE)
+    assert response.status_code == 200
+
+
+def duplicates(**params):
+    response = client.get("/product-tree/duplicates", params=params)
+    assert response.status_code == 200
+    return response.json()
+
+
+def test_reworded_titles_cluster_together():
+    result = duplicates()
+    assert result["total_clusters"] == 1
+    cluster = result["clusters"][0]
+    assert [node["id"] for node in cluster["nodes"]] == ["login-1", "login-2", "login-3"]
+    assert all(node["similarity"] == 1.0 for node in cluster["nodes"])
+
+
+def test_edits_update_the_clusters():
+    duplicates()
+    client.put("/product-tree/nodes/search", json={"updates": {"title": "Login page revamp"}})
+    assert [node["id"] for node in duplicates()["clusters"][0]["nodes"]] == ["login-1", "login-2", "login-3", "search"]
+
+    client.delete("/product-tree/nodes/login-2")
+    client.delete("/product-tree/nodes/login-3")
+    client.delete("/product-tree/nodes/search")
+    assert duplicates()["total_clusters"] == 0
+
+
+def test_parameters_are_clamped():
+    assert duplicates(threshold=0)["threshold"] == 1 / main.DUPLICATE_MINHASH_PERMUTATIONS
+    assert duplicates(threshold=5)["threshold"] == 1.0
+    assert len(duplicates(limit=0)["clusters"]) == 1
+
+
+def test_duplicates_support_etags():
+    response = client.get("/product-tree/duplicates")
+    cached = client.get("/product-tree/duplicates", headers={"If-None-Match": response.headers["etag"]})
+    assert cached.status_code == 304
+    other = client.get("/product-tree/duplicates", params={"threshold": 0.9}, headers={"If-None-Match": response.headers["etag"]})
+    assert other.status_code == 200
+
+
+def test_clusters_are_stars_not_chains():
+    # a~b and b~c are similar, but a and c are not: chaining would merge all three
+    words = [f"word{index}" for index in range(12)]
+    nodes = {
+        "a": {"title": " ".join(words[0:8])},
+        "b": {"title": " ".join(words[2:10])},
+        "c": {"title": " ".join(words[4:12])},
+    }
+    index = main.DuplicateIndex(main.DUPLICATE_MINHASH_PERMUTATIONS, main.DUPLICATE_LSH_BANDS)
+    for node_id, node in nodes.items():
+        index.add(node_id, node)
+
+    threshold = 0.5
+    clusters = index.find_clusters(threshold)
+    assert clusters
+    for cluster in clusters:
+        leader_id = cluster[0][0]
+        for node_id, similarity in cluster[1:]:
+            assert similarity == index.similarity(leader_id, node_id) >= threshold
+    assert not any({"a", "c"} <= {node_id for node_id, _ in cluster} for cluster in clusters)
@@ -0,0 +1,46 @@
+from fastapi.testclient import TestClient
+
+from main import app
+
+client = TestClient(app)
+
+
+def current_version():
+    return client.get("/product-tree/versions").json()["current_version"]
+
+
+def test_duplicate_node_ids_are_rejected():
+    version = current_version()
+    tree = {"nodes": [{"id": "a", "title": "A"}, {"id": "a", "title": "Again"}], "edges": []}
+    response = client.post("/product-tree/import", json=tree)
+    assert response.status_code == 400
+    assert "Duplicate node id a" in response.json()["detail"]
+    assert current_version() == version
+
+
+def test_integer_and_string_ids_collide():
+    tree = {"nodes": [{"id": 1, "title": "One"}, {"id": "1", "title": "Also one"}], "edges": []}
+    assert client.post("/product-tree/import", json=tree).status_code == 400
+
+
+def test_malformed_edges_are_rejected():
+    tree = {"nodes": [{"id": "a"}], "edges": [{"from": "a"}]}
+    assert client.post("/product-tree/import", json=tree).status_code == 400
+
+
+def test_integer_ids_are_stored_as_strings():
+    tree = {
+        "nodes": [{"id": 1, "title": "Root", "type": "goal"}, {"id": 2, "title": "Child", "type": "job"}],
+        "edges": [{"from": 1, "to": 2}],
+    }
+    response = client.post("/product-tree/import", json=tree)
+    assert response.status_code == 200
+    assert response.json()["message"] == "Imported 2 nodes"
+
+    node = client.get("/product-tree/nodes/2").json()["node"]
+    assert node["id"] == "2"
+    assert node["parent_id"] == "1"
+
+    response = client.post("/product-tree/batch", json={"operations": [{"op": "move", "node_id": "2", "parent_id": None}]})
+    assert response.status_code == 200
+    assert client.get("/product-tree/nodes/2").json()["node"]["parent_id"] is None
@@ -0,0 +1,72 @@
+import pytest
+from fastapi.testclient import TestClient
+
+import main
+from main import app
+
+client = TestClient(app)
+
+TREE = {
+    "nodes": [
+        {"id": "root", "title": "Root", "type": "outcome"},
+        {"id": "a", "title": "A", "type": "opportunity"},
+        {"id": "a1", "title": "A1", "type": "solution"},
+    ],
+    "edges": [
+        {"from": "root", "to": "a"},
+        {"from": "a", "to": "a1"},
+    ],
+}
+
+
+@pytest.fixture(autouse=True)
+def imported_tree():
+    response = client.post("/product-tree/import", json=TREE)
+    assert response.status_code == 200
+    return response.json()["version"]
+
+
+def test_create_commits_a_version(imported_tree):
+    response = client.post("/product-tree/nodes", json={"node_id": "b", "title": "B", "type": "opportunity", "parent_id": "root"})
+    assert response.status_code == 200
+    assert response.json()["version"] == imported_tree + 1
+    assert response.json()["node"]["status"] == "Not Started"
+
+    node = client.get("/product-tree/nodes/b").json()["node"]
+    assert node["title"] == "B"
+    assert node["parent_id"] == "root"
+    assert main.change_log[-1]["type"] == "node_created"
+
+
+def test_create_rejects_existing_ids_and_missing_parents(imported_tree):
+    assert client.post("/product-tree/nodes", json={"node_id": "a", "title": "A", "type": "job"}).status_code == 400
+    assert client.post("/product-tree/nodes", json={"node_id": "c", "title": "C", "type": "job", "parent_id": "nope"}).status_code == 400
+    assert client.get("/product-tree/versions").json()["current_version"] == imported_tree
+
+
+def test_update_accepts_the_ui_payload():
+    response = client.put("/product-tree/nodes/a1", json={"updates": {"title": "Renamed", "status": "Done"}})
+    assert response.status_code == 200
+    assert response.json()["node"]["title"] == "Renamed"
+    node = client.get("/product-tree/nodes/a1").json()["node"]
+    assert node["status"] == "Done"
+    assert node["parent_id"] == "a"
+    assert main.change_log[-1]["type"] == "node_updated"
+
+
+def test_update_and_delete_of_missing_nodes_return_404():
+    assert client.put("/product-tree/nodes/nope", json={"updates": {"title": "X"}}).status_code == 404
+    assert client.delete("/product-tree/nodes/nope").status_code == 404
+
+
+def test_update_cannot_change_parent():
+    response = client.put("/product-tree/nodes/a1", json={"updates": {"parent_id": "root"}})
+    assert response.status_code == 400
+
+
+def test_delete_removes_the_node_and_keeps_children():
+    response = client.delete("/product-tree/nodes/a")
+    assert response.status_code == 200
+    assert client.get("/product-tree/nodes/a").status_code == 404
+    assert client.get("/product-tree/nodes/a1").json()["node"]["parent_id"] is None
+    assert main.change_log[-1]["type"] == "node_deleted"
@@ -0,0 +1,50 @@
+import pytest
+from fastapi.testclient import TestClient
+
+import main
+from main import app
+
+client = TestClient(app)
+
+TOKEN = "test-admin-token"
+
+
+@pytest.fixture
+def admin_token(monkeypatch):
+    monkeypatch.setattr(main, "PROFILE_ADMIN_TOKEN", TOKEN)
+    return TOKEN
+
+
+def test_admin_endpoints_are_disabled_without_a_token(monkeypatch):
+    monkeypatch.setattr(main, "PROFILE_ADMIN_TOKEN", None)
+    assert client.get("/admin/profiles").status_code == 404
+    assert client.get("/admin/profiles", headers={"X-Admin-Token": ""}).status_code == 404
+
+
+def test_admin_endpoints_require_the_token(admin_token):
+    assert client.get("/admin/profiles").status_code == 403
+    assert client.get("/admin/profiles", headers={"X-Admin-Token": "wrong"}).status_code == 403
+    assert client.get("/admin/profiles", headers={"X-Admin-Token": admin_token}).status_code == 200
+
+
+def test_anonymous_callers_cannot_force_profiling(admin_token):
+    response = client.get("/product-tree/versions", headers={"X-Dot-Profile": "1"})
+    assert "x-dot-profile-id" not in response.headers
+    response = client.get("/product-tree/versions", headers={"X-Dot-Profile": "1", "X-Admin-Token": "wrong"})
+    assert "x-dot-profile-id" not in response.headers
+
+
+def test_admins_can_profile_a_request(admin_token):
+    headers = {"X-Dot-Profile": "1", "X-Admin-Token": admin_token}
+    profile_id = client.get("/product-tree/versions", headers=headers).headers["x-dot-profile-id"]
+
+    profile = client.get(f"/admin/profiles/{profile_id}", headers={"X-Admin-Token": admin_token}).json()
+    assert profile["path"] == "/product-tree/versions"
+    assert profile["sampled"] is True
+    assert "framework_and_other" in profile["phases_ms"]
+
+
+def test_profiling_disabled_when_no_token_is_configured(monkeypatch):
+    monkeypatch.setattr(main, "PROFILE_ADMIN_TOKEN", None)
+    response = client.get("/product-tree/versions", headers={"X-Dot-Profile": "1", "X-Admin-Token": ""})
+    assert "x-dot-profile-id" not in response.headers
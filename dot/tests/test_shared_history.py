@@ -0,0 +1,175 @@
+import asyncio
+import sqlite3
+
+import pytest
+
+import main
+from main import BatchOperation, SharedTreeHistory, TreeSnapshot
+
+HISTORY_SIZE = 6
+CHECKPOINT_INTERVAL = 4
+
+TREE = {
+    "nodes": [{"id": "root", "title": "Root", "type": "goal"}, {"id": "a", "title": "A", "type": "job"}],
+    "edges": [{"from": "root", "to": "a"}],
+}
+
+
+@pytest.fixture(autouse=True)
+def small_checkpoint_interval(monkeypatch):
+    monkeypatch.setattr(main, "TREE_STORE_CHECKPOINT_INTERVAL", CHECKPOINT_INTERVAL)
+
+
+@pytest.fixture
+def store(tmp_path):
+    return str(tmp_path / "tree.db")
+
+
+async def commit_import(history, tree):
+    async with history.write_lock():
+        await history.sync()
+        snapshot = main.build_imported_snapshot(tree).with_version(history.next_version(), "Imported tree")
+        await history.commit(snapshot, [main.make_tree_event(snapshot.version, "tree_imported", index=0)])
+    return snapshot
+
+
+async def commit_batch(history, *operations):
+    async with history.write_lock():
+        await history.sync()
+        snapshot, results, changes, success = main.apply_batch_operations(
+            history.current(), [BatchOperation(**operation) for operation in operations], history.next_version()
+        )
+        assert success, results
+        events = [
+            main.make_tree_event(snapshot.version, event_type, node_id, index=index, **data)
+            for index, (event_type, node_id, data) in enumerate(changes)
+        ]
+        await history.commit(snapshot, events)
+    return snapshot
+
+
+def create(node_id, parent_id="root"):
+    return {"op": "create", "node_id": node_id, "node": {"title": node_id.upper(), "type": "job"}, "parent_id": parent_id}
+
+
+def same_tree(first: TreeSnapshot, second: TreeSnapshot):
+    """Same version, content and order, so every worker renders identical documents"""
+    return (
+        (first.version, first.as_dict(), first.next_position) == (second.version, second.as_dict(), second.next_position)
+        and dict(first.children) == dict(second.children)
+        and dict(first.positions) == dict(second.positions)
+    )
+
+
+async def commit_alternating(first, second, count):
+    """Commit `count` batches, alternating writers, and return every snapshot by version"""
+    committed = {}
+    for number in range(count):
+        writer = first if number % 2 == 0 else second
+        snapshot = await commit_batch(
+            writer,
+            create(f"n{number}"),
+            {"op": "update", "node_id": "a", "updates": {"title": f"A{number}"}},
+            {"op": "move", "node_id": f"n{number - 1}" if number else "a", "parent_id": "a" if number else None},
+        )
+        committed[snapshot.version] = snapshot
+    return committed
+
+
+def stored_kinds(store):
+    with sqlite3.connect(store) as connection:
+        return dict(connection.execute("SELECT version, kind FROM versions ORDER BY version").fetchall())
+
+
+def test_workers_converge_through_deltas_and_checkpoints(store):
+    async def scenario():
+        first, second = SharedTreeHistory(HISTORY_SIZE, store), SharedTreeHistory(HISTORY_SIZE, store)
+        await commit_import(first, TREE)
+        committed = await commit_alternating(first, second, 20)
+        await first.sync()
+        await second.sync()
+        return first, second, committed
+
+    first, second, committed = asyncio.run(scenario())
+    latest = max(committed)
+    assert first.latest_version == second.latest_version == latest
+    assert same_tree(first.current(), committed[latest])
+    assert same_tree(second.current(), committed[latest])
+    assert first.epoch == second.epoch
+
+    kinds = stored_kinds(store)
+    assert "delta" in kinds.values()
+    checkpoints = [version for version, kind in kinds.items() if kind == "checkpoint"]
+    assert all(later - earlier <= CHECKPOINT_INTERVAL for earlier, later in zip(checkpoints, checkpoints[1:]))
+
+
+def test_pruning_keeps_the_base_checkpoint_of_retained_versions(store):
+    async def scenario():
+        first, second = SharedTreeHistory(HISTORY_SIZE, store), SharedTreeHistory(HISTORY_SIZE, store)
+        await commit_import(first, TREE)
+        committed = await commit_alternating(first, second, 20)
+        latest = max(committed)
+
+        # A worker that starts now rebuilds every retained version from the store
+        fresh = SharedTreeHistory(HISTORY_SIZE, store)
+        await fresh.sync()
+        oldest_retained = latest - HISTORY_SIZE + 1
+        fresh.snapshots.clear()
+        fresh.snapshots[latest] = committed[latest]
+        loaded = {version: await fresh.get(version) for version in range(oldest_retained, latest + 1)}
+        pruned = await fresh.get(1)
+        return committed, loaded, pruned
+
+    committed, loaded, pruned = asyncio.run(scenario())
+    assert pruned is None
+    for version, snapshot in loaded.items():
+        assert snapshot is not None, version
+        assert same_tree(snapshot, committed[version])
+
+    kinds = stored_kinds(store)
+    assert min(kinds) <= max(committed) - HISTORY_SIZE + 1
+    assert kinds[min(kinds)] == "checkpoint"
+
+
+def test_replay_skips_deltas_until_a_checkpoint(store):
+    async def scenario():
+        history = SharedTreeHistory(HISTORY_SIZE, store)
+        await commit_import(history, TREE)
+        for number in range(CHECKPOINT_INTERVAL + 2):
+            await commit_batch(history, create(f"n{number}"))
+        return history
+
+    history = asyncio.run(scenario())
+    with sqlite3.connect(store) as connection:
+        rows = connection.execute(
+            "SELECT version, created_at, description, kind, base_version, data FROM versions ORDER BY version"
+        ).fetchall()
+
+    checkpoints = [row[0] for row in rows if row[3] == "checkpoint"]
+    assert len(checkpoints) >= 2
+    # Without the first checkpoint the deltas after it have no base
+    replayed = SharedTreeHistory._replay(None, rows[1:])
+    assert replayed[0].version == checkpoints[1]
+    assert same_tree(replayed[-1], history.current())
+
+
+def test_sync_after_pruned_events_starts_with_resync(store):
+    async def scenario():
+        writer, reader = SharedTreeHistory(HISTORY_SIZE, store), SharedTreeHistory(HISTORY_SIZE, store)
+        await commit_import(writer, TREE)
+        await commit_batch(writer, create("first"))
+        caught_up = await reader.sync()
+
+        await commit_batch(writer, create("second"))
+        one_behind = await reader.sync()
+
+        for number in range(HISTORY_SIZE + 3):
+            await commit_batch(writer, create(f"n{number}"))
+        far_behind = await reader.sync()
+        return writer, reader, caught_up, one_behind, far_behind
+
+    writer, reader, caught_up, one_behind, far_behind = asyncio.run(scenario())
+    assert [event["type"] for event in caught_up] == ["tree_imported", "node_created"]
+    assert [event["node_id"] for event in one_behind] == ["second"]
+    assert far_behind[0] == {"version": writer.latest_version, "type": "resync"}
+    assert same_tree(reader.current(), writer.current())
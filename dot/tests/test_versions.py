@@ -0,0 +1,61 @@
+import pytest
+from fastapi.testclient import TestClient
+
+import main
+from main import app
+
+client = TestClient(app)
+
+TREE = {
+    "nodes": [{"id": "root", "title": "Root", "type": "goal"}, {"id": "a", "title": "A", "type": "job"}],
+    "edges": [{"from": "root", "to": "a"}],
+}
+
+
+@pytest.fixture(autouse=True)
+def imported_tree():
+    response = client.post("/product-tree/import", json=TREE)
+    assert response.status_code == 200
+    return response.json()["version"]
+
+
+def test_pinned_versions_keep_their_content(imported_tree):
+    client.put("/product-tree/nodes/a", json={"updates": {"title": "Changed"}})
+
+    pinned = client.get(f"/product-tree/versions/{imported_tree}").json()
+    assert pinned["version"] == imported_tree
+    assert [node["title"] for node in pinned["tree"]["nodes"]] == ["Root", "A"]
+
+    versions = client.get("/product-tree/versions").json()
+    assert versions["current_version"] == imported_tree + 1
+    assert [summary["version"] for summary in versions["versions"]][:2] == [imported_tree + 1, imported_tree]
+
+
+def test_revert_commits_the_old_tree_as_a_new_version(imported_tree):
+    client.delete("/product-tree/nodes/a")
+    assert client.get("/product-tree/nodes/a").status_code == 404
+
+    response = client.post(f"/product-tree/versions/{imported_tree}/revert")
+    assert response.status_code == 200
+    assert response.json() == {"success": True, "version": imported_tree + 2, "reverted_to": imported_tree}
+
+    node = client.get("/product-tree/nodes/a").json()["node"]
+    assert node["title"] == "A"
+    assert node["parent_id"] == "root"
+    assert main.change_log[-1]["type"] == "tree_reverted"
+    # The deletion stays in the history
+    deleted = client.get(f"/product-tree/versions/{imported_tree + 1}").json()
+    assert [node["id"] for node in deleted["tree"]["nodes"]] == ["root"]
+
+
+def test_unknown_versions_return_404(imported_tree):
+    assert client.get(f"/product-tree/versions/{imported_tree + 50}").status_code == 404
+    assert client.post(f"/product-tree/versions/{imported_tree + 50}/revert").status_code == 404
+    assert client.get("/product-tree/versions").json()["current_version"] == imported_tree
+
+
+def test_revert_of_pruned_versions_returns_404(imported_tree):
+    for number in range(main.TREE_HISTORY_SIZE):
+        client.put("/product-tree/nodes/a", json={"updates": {"title": f"A{number}"}})
+    assert client.get(f"/product-tree/versions/{imported_tree}").status_code == 404
+    assert client.post(f"/product-tree/versions/{imported_tree}/revert").status_code == 404